@@ -2,19 +2,62 @@
 Background execution helper for async workflow processing.
 """
 
-import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+import anyio
 
-from app.database import SessionLocal
-from app.models import Graph, WorkflowRun, ExecutionLog, RunStatus
-from app.engine import WorkflowGraph, FunctionNode, WorkflowExecutor
+from app.database import SessionLocal, use_async_commit
+from app.serialization import dumps
+from app.api.logs import build_log_rows
+from app.models import Graph, WorkflowRun, ExecutionLog, RunStatus, NODE_LIST_ADAPTER, EDGE_LIST_ADAPTER
+from app.engine import WorkflowGraph, FunctionNode, WorkflowExecutor, compile_condition
 from app.tools.registry import ToolRegistry
 
 
+# Compiled graphs keyed by (graph_id, updated_at), evicted in LRU order
+GRAPH_CACHE_SIZE = 128
+_GRAPH_CACHE: OrderedDict[Tuple[str, Optional[datetime]], WorkflowGraph] = OrderedDict()
+_GRAPH_CACHE_LOCK = threading.Lock()
+
+
 def build_workflow_graph_from_db(graph: Graph) -> WorkflowGraph:
     """
-    Build a WorkflowGraph from database graph.
+    Build a WorkflowGraph from database graph, reusing a cached instance.
+    
+    WorkflowGraph holds no per-run state (that lives in the executor),
+    so the same instance is safely shared between runs of a graph. The
+    cache key includes updated_at so edited graphs are rebuilt.
+    
+    Args:
+        graph: Database graph model
+        
+    Returns:
+        WorkflowGraph instance
+    """
+    key = (graph.id, graph.updated_at)
+    
+    with _GRAPH_CACHE_LOCK:
+        wf_graph = _GRAPH_CACHE.get(key)
+        if wf_graph is not None:
+            _GRAPH_CACHE.move_to_end(key)
+            return wf_graph
+    
+    wf_graph = _compile_workflow_graph(graph)
+    
+    with _GRAPH_CACHE_LOCK:
+        _GRAPH_CACHE[key] = wf_graph
+        _GRAPH_CACHE.move_to_end(key)
+        while len(_GRAPH_CACHE) > GRAPH_CACHE_SIZE:
+            _GRAPH_CACHE.popitem(last=False)
+    
+    return wf_graph
+
+
+def _compile_workflow_graph(graph: Graph) -> WorkflowGraph:
+    """
+    Parse a database graph and build a new WorkflowGraph from it.
     
     Args:
         graph: Database graph model
@@ -22,45 +65,66 @@ def build_workflow_graph_from_db(graph: Graph) -> WorkflowGraph:
     Returns:
         WorkflowGraph instance
     """
-    # Parse nodes and edges
-    nodes_data = json.loads(graph.nodes)
-    edges_data = json.loads(graph.edges)
+    # Parse and validate nodes and edges straight from the stored JSON
+    nodes = NODE_LIST_ADAPTER.validate_json(graph.nodes)
+    edges = EDGE_LIST_ADAPTER.validate_json(graph.edges)
     
     # Create workflow graph
     wf_graph = WorkflowGraph(name=graph.name, description=graph.description)
     
+    # Resolve every distinct tool once, failing up front on unknown names
+    tool_names = {node.function for node in nodes}
+    missing_tools = tool_names - ToolRegistry.list_tools().keys()
+    if missing_tools:
+        raise KeyError(f"Tools not found in registry: {sorted(missing_tools)}")
+    tool_map = {name: ToolRegistry.get_info(name) for name in tool_names}
+    
     # Add nodes
-    for node_data in nodes_data:
-        function = ToolRegistry.get(node_data["function"])
-        node = FunctionNode(
-            name=node_data["name"],
-            function=function,
-            description=node_data.get("description")
-        )
-        wf_graph.add_node(node)
+    for node in nodes:
+        tool_info = tool_map[node.function]
+        wf_graph.add_node(FunctionNode(
+            name=node.name,
+            function=tool_info["function"],
+            description=node.description,
+            returns_delta=tool_info["returns_delta"]
+        ))
     
     # Add edges
-    for edge_data in edges_data:
+    for edge in edges:
         condition = None
-        if edge_data.get("condition"):
-            condition_str = edge_data["condition"]
-            condition = lambda state, cond=condition_str: eval(cond, {"__builtins__": {}}, state.to_dict())
+        if edge.condition:
+            condition = compile_condition(edge.condition)
         
         wf_graph.add_edge(
-            from_node=edge_data["from_node"],
-            to_node=edge_data["to_node"],
+            from_node=edge.from_node,
+            to_node=edge.to_node,
             condition=condition
         )
     
     return wf_graph
 
 
-def execute_workflow_background(run_id: str, graph_id: str, initial_state: dict):
+async def execute_workflow_background(run_id: str, graph_id: str, initial_state: dict):
     """
     Execute workflow in background.
     
-    This function runs in a background task and updates the database
-    with execution results.
+    This coroutine runs as a background task; the blocking database and
+    executor work is offloaded to a worker thread so the event loop stays
+    free for other requests and WebSocket clients.
+    
+    Args:
+        run_id: Workflow run ID
+        graph_id: Graph ID
+        initial_state: Initial state dictionary
+    """
+    await anyio.to_thread.run_sync(_execute_workflow_sync, run_id, graph_id, initial_state)
+
+
+def _execute_workflow_sync(run_id: str, graph_id: str, initial_state: dict):
+    """
+    Execute workflow and update the database with execution results.
+    
+    Opens its own session, so it is safe to call from a worker thread.
     
     Args:
         run_id: Workflow run ID
@@ -71,8 +135,8 @@ def execute_workflow_background(run_id: str, graph_id: str, initial_state: dict)
     
     try:
         # Get graph and workflow run
-        graph = db.query(Graph).filter(Graph.id == graph_id).first()
-        workflow_run = db.query(WorkflowRun).filter(WorkflowRun.id == run_id).first()
+        graph = db.get(Graph, graph_id)
+        workflow_run = db.get(WorkflowRun, run_id)
         
         if not graph or not workflow_run:
             return
@@ -88,25 +152,18 @@ def execute_workflow_background(run_id: str, graph_id: str, initial_state: dict)
         
         # Update with results
         workflow_run.status = RunStatus.COMPLETED
-        workflow_run.current_state = json.dumps(result["final_state"])
+        workflow_run.current_state = dumps(result["final_state"])
         workflow_run.completed_at = datetime.utcnow()
         
-        # Save execution logs
-        for log_entry in result["execution_log"]:
-            exec_log = ExecutionLog(
-                run_id=run_id,
-                node_name=log_entry["node_name"],
-                step_number=log_entry["step_number"],
-                state_before=json.dumps(log_entry["state_before"]),
-                state_after=json.dumps(log_entry["state_after"]),
-                error=log_entry.get("error")
-            )
-            db.add(exec_log)
+        # Save execution logs in a single batched INSERT
+        db.bulk_insert_mappings(ExecutionLog, build_log_rows(run_id, result["execution_log"], result["state_patches"]))
         
+        use_async_commit(db)
         db.commit()
         
     except Exception as e:
         # Update status to failed
+        db.rollback()
         workflow_run.status = RunStatus.FAILED
         workflow_run.error_message = str(e)
         workflow_run.completed_at = datetime.utcnow()
@@ -0,0 +1,81 @@
+"""
+Execution log persistence helpers.
+
+Steps are stored as JSON patches against the previous state, with a full
+state snapshot every `log_snapshot_interval` steps to anchor the replay.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from app.config import settings
+from app.engine import apply_state_patch
+from app.serialization import dumps, loads
+
+
+def build_log_rows(
+    run_id: str,
+    execution_log: List[Dict[str, Any]],
+    state_patches: List[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Convert executor log entries into ExecutionLog insert mappings.
+    
+    Args:
+        run_id: Workflow run ID
+        execution_log: Log entries returned by WorkflowExecutor.execute()
+        state_patches: Matching state patches returned by WorkflowExecutor.execute()
+        
+    Returns:
+        List of column mappings for bulk_insert_mappings()
+    """
+    interval = max(settings.log_snapshot_interval, 1)
+    
+    return [
+        {
+            "run_id": run_id,
+            "node_name": log_entry["node_name"],
+            "step_number": log_entry["step_number"],
+            "state_before": dumps(log_entry["state_before"]) if index % interval == 0 else None,
+            "state_patch": dumps(state_patch),
+            "executed_at": log_entry["executed_at"],
+            "error": log_entry.get("error")
+        }
+        for index, (log_entry, state_patch) in enumerate(zip(execution_log, state_patches))
+    ]
+
+
+def replay_log_rows(rows: Iterable[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Rebuild full before/after states from stored log rows.
+    
+    Rows must belong to one run and be ordered by step number.
+    
+    Args:
+        rows: ExecutionLog column mappings
+        
+    Yields:
+        Log entry dictionaries with full state_before and state_after
+    """
+    state: Optional[Dict[str, Any]] = None
+    
+    for row in rows:
+        if row["state_before"] is not None:
+            state_before = loads(row["state_before"])
+        else:
+            state_before = state
+        
+        if row["state_after"] is not None:
+            state_after = loads(row["state_after"])
+        else:
+            state_after = apply_state_patch(state_before, loads(row["state_patch"]))
+        
+        state = state_after
+        
+        yield {
+            "node_name": row["node_name"],
+            "step_number": row["step_number"],
+            "state_before": state_before,
+            "state_after": state_after,
+            "executed_at": row["executed_at"],
+            "error": row["error"]
+        }
@@ -2,14 +2,18 @@
 FastAPI routes for workflow graph management and execution.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, BackgroundTasks, Header, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-import json
+from typing import List, Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, use_async_commit
+from app.serialization import dumps, loads
 from app.models import (
+    generate_uuid,
     Graph,
     WorkflowRun,
     ExecutionLog,
@@ -20,16 +24,20 @@ from app.models import (
     RunRequest,
     RunResponse,
     StateResponse,
-    ExecutionLogResponse,
-    NodeDefinition,
-    EdgeDefinition
+    NODE_LIST_ADAPTER,
+    EDGE_LIST_ADAPTER
 )
-from app.engine import WorkflowGraph, FunctionNode, WorkflowExecutor
+from app.engine import WorkflowGraph, WorkflowExecutor, compile_condition
 from app.tools.registry import ToolRegistry
 from app.api.websocket import manager
+from app.api.background import build_workflow_graph_from_db
+from app.api.logs import build_log_rows, replay_log_rows
 
 router = APIRouter()
 
+# Pre-encoded reply to application-level "ping" messages
+_PONG = dumps({"type": "pong"})
+
 
 @router.websocket("/ws/run/{run_id}")
 async def websocket_endpoint(websocket: WebSocket, run_id: str):
@@ -51,17 +59,22 @@ async def websocket_endpoint(websocket: WebSocket, run_id: str):
             "state_after": dict,
             "message": str
         }
+    
+        Messages emitted close together are delivered as one frame:
+        {"type": "batch", "items": [<message>, ...]}
     """
     await manager.connect(run_id, websocket)
     try:
-        # Keep connection alive and listen for client messages
+        # Idle until the client disconnects; keepalive is handled by the
+        # server's protocol-level ping/pong. Clients may still send "ping"
+        # to get an application-level pong.
         while True:
-            # Receive text to keep connection open
-            # Client can send "ping" to check connection
-            data = await websocket.receive_text()
-            if data == "ping":
-                await websocket.send_json({"type": "pong"})
-    except WebSocketDisconnect:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") == "ping":
+                await websocket.send_text(_PONG)
+    finally:
         manager.disconnect(run_id, websocket)
 
 
@@ -79,34 +92,46 @@ def create_graph(graph_data: GraphCreate, db: Session = Depends(get_db)):
     """
     # Validate that all referenced functions exist in tool registry
     available_tools = ToolRegistry.list_tools()
-    
-    for node in graph_data.nodes:
-        if node.function not in available_tools:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Function '{node.function}' not found in tool registry. Available tools: {list(available_tools.keys())}"
-            )
+    missing_tools = {node.function for node in graph_data.nodes} - available_tools.keys()
+    if missing_tools:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Functions not found in tool registry: {sorted(missing_tools)}. Available tools: {list(available_tools.keys())}"
+        )
     
     # Validate edges reference existing nodes
     node_names = {node.name for node in graph_data.nodes}
+    referenced_nodes = {
+        *(edge.from_node for edge in graph_data.edges),
+        *(edge.to_node for edge in graph_data.edges)
+    }
+    missing_nodes = referenced_nodes - node_names
+    if missing_nodes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Edges reference non-existent nodes: {sorted(missing_nodes)}"
+        )
+    
+    # Validate edge conditions against the condition grammar
     for edge in graph_data.edges:
-        if edge.from_node not in node_names:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Edge references non-existent source node: {edge.from_node}"
-            )
-        if edge.to_node not in node_names:
+        if not edge.condition:
+            continue
+        try:
+            compile_condition(edge.condition)
+        except SyntaxError as e:
             raise HTTPException(
                 status_code=400,
-                detail=f"Edge references non-existent destination node: {edge.to_node}"
-            )
+                detail=f"Invalid syntax in condition '{edge.condition}': {e.msg}"
+            ) from None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from None
     
     # Create graph in database
     graph = Graph(
         name=graph_data.name,
         description=graph_data.description,
-        nodes=json.dumps([node.model_dump() for node in graph_data.nodes]),
-        edges=json.dumps([edge.model_dump() for edge in graph_data.edges])
+        nodes=dumps([node.model_dump() for node in graph_data.nodes]),
+        edges=dumps([edge.model_dump() for edge in graph_data.edges])
     )
     
     db.add(graph)
@@ -133,14 +158,14 @@ def get_graph(graph_id: str, db: Session = Depends(get_db)):
     Returns:
         Graph details
     """
-    graph = db.query(Graph).filter(Graph.id == graph_id).first()
+    graph = db.get(Graph, graph_id)
     
     if not graph:
         raise HTTPException(status_code=404, detail=f"Graph '{graph_id}' not found")
     
-    # Parse nodes and edges
-    nodes = [NodeDefinition(**node) for node in json.loads(graph.nodes)]
-    edges = [EdgeDefinition(**edge) for edge in json.loads(graph.edges)]
+    # Parse and validate nodes and edges straight from the stored JSON
+    nodes = NODE_LIST_ADAPTER.validate_json(graph.nodes)
+    edges = EDGE_LIST_ADAPTER.validate_json(graph.edges)
     
     return GraphDetail(
         graph_id=graph.id,
@@ -185,41 +210,56 @@ def build_workflow_graph(graph: Graph) -> WorkflowGraph:
         graph: Database graph model
         
     Returns:
-        WorkflowGraph instance
+        WorkflowGraph instance (shared via the compiled graph cache)
     """
-    # Parse nodes and edges
-    nodes_data = json.loads(graph.nodes)
-    edges_data = json.loads(graph.edges)
-    
-    # Create workflow graph
-    wf_graph = WorkflowGraph(name=graph.name, description=graph.description)
-    
-    # Add nodes
-    for node_data in nodes_data:
-        function = ToolRegistry.get(node_data["function"])
-        node = FunctionNode(
-            name=node_data["name"],
-            function=function,
-            description=node_data.get("description")
-        )
-        wf_graph.add_node(node)
-    
-    # Add edges
-    for edge_data in edges_data:
-        condition = None
-        if edge_data.get("condition"):
-            # Parse condition string into a lambda
-            # For now, we'll support simple conditions like "quality_score >= threshold"
-            condition_str = edge_data["condition"]
-            condition = lambda state, cond=condition_str: eval(cond, {"__builtins__": {}}, state.to_dict())
+    return build_workflow_graph_from_db(graph)
+
+
+def reserve_run_id(run_request: RunRequest, db: Session) -> str:
+    """
+    Pick the ID for a new run.
+    
+    Clients may choose the run ID themselves so they can subscribe to
+    WS /ws/run/{run_id} before starting the run and receive every log
+    message, including the first steps.
+    
+    Args:
+        run_request: Run request, optionally carrying a run ID
+        db: Database session
         
-        wf_graph.add_edge(
-            from_node=edge_data["from_node"],
-            to_node=edge_data["to_node"],
-            condition=condition
-        )
+    Returns:
+        The requested run ID, or a newly generated one
+        
+    Raises:
+        HTTPException: If the requested run ID is already taken
+    """
+    if run_request.run_id is None:
+        return generate_uuid()
+    if db.get(WorkflowRun, run_request.run_id) is not None:
+        raise HTTPException(status_code=409, detail=f"Run '{run_request.run_id}' already exists")
+    return run_request.run_id
+
+
+def insert_run(db: Session, workflow_run: WorkflowRun) -> None:
+    """
+    Insert a new run row and flush it.
+    
+    The primary key catches a client-chosen run ID taken by a concurrent
+    request after reserve_run_id() checked it.
     
-    return wf_graph
+    Args:
+        db: Database session
+        workflow_run: New workflow run
+        
+    Raises:
+        HTTPException: If a run with the same ID already exists
+    """
+    db.add(workflow_run)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Run '{workflow_run.id}' already exists") from None
 
 
 @router.post("/graph/run", response_model=RunResponse)
@@ -235,20 +275,22 @@ def run_graph(run_request: RunRequest, db: Session = Depends(get_db)):
         Execution results with final state and logs
     """
     # Get graph
-    graph = db.query(Graph).filter(Graph.id == run_request.graph_id).first()
+    graph = db.get(Graph, run_request.graph_id)
     
     if not graph:
         raise HTTPException(status_code=404, detail=f"Graph '{run_request.graph_id}' not found")
     
-    # Create workflow run
+    # Create workflow run; committed before execution so that
+    # GET /graph/state/{run_id} reports it as running meanwhile
     workflow_run = WorkflowRun(
+        id=reserve_run_id(run_request, db),
         graph_id=graph.id,
         status=RunStatus.RUNNING,
-        current_state=json.dumps(run_request.initial_state)
+        current_state=dumps(run_request.initial_state),
+        started_at=datetime.utcnow()
     )
-    db.add(workflow_run)
+    insert_run(db, workflow_run)
     db.commit()
-    db.refresh(workflow_run)
     
     try:
         # Build workflow graph
@@ -260,52 +302,32 @@ def run_graph(run_request: RunRequest, db: Session = Depends(get_db)):
         
         # Update run status
         workflow_run.status = RunStatus.COMPLETED
-        workflow_run.current_state = json.dumps(result["final_state"])
-        workflow_run.completed_at = db.query(WorkflowRun).filter(
-            WorkflowRun.id == workflow_run.id
-        ).first().started_at  # Use current time
+        workflow_run.current_state = dumps(result["final_state"])
+        workflow_run.completed_at = datetime.utcnow()
         
-        # Save execution logs
-        for log_entry in result["execution_log"]:
-            exec_log = ExecutionLog(
-                run_id=workflow_run.id,
-                node_name=log_entry["node_name"],
-                step_number=log_entry["step_number"],
-                state_before=json.dumps(log_entry["state_before"]),
-                state_after=json.dumps(log_entry["state_after"]),
-                error=log_entry.get("error")
-            )
-            db.add(exec_log)
+        # Save execution logs in a single batched INSERT
+        db.bulk_insert_mappings(ExecutionLog, build_log_rows(workflow_run.id, result["execution_log"], result["state_patches"]))
         
+        use_async_commit(db)
         db.commit()
         db.refresh(workflow_run)
         
-        # Get logs
-        logs = db.query(ExecutionLog).filter(ExecutionLog.run_id == workflow_run.id).all()
-        
-        return RunResponse(
-            run_id=workflow_run.id,
-            graph_id=workflow_run.graph_id,
-            status=workflow_run.status,
-            final_state=result["final_state"],
-            execution_logs=[
-                ExecutionLogResponse(
-                    node_name=log.node_name,
-                    step_number=log.step_number,
-                    state_before=json.loads(log.state_before),
-                    state_after=json.loads(log.state_after),
-                    executed_at=log.executed_at,
-                    error=log.error
-                )
-                for log in logs
-            ],
-            started_at=workflow_run.started_at,
-            completed_at=workflow_run.completed_at,
-            error_message=None
-        )
+        # Payload is already JSON-safe, and the executor's log entries have
+        # exactly the response fields, so serialize them directly with orjson
+        return ORJSONResponse({
+            "run_id": workflow_run.id,
+            "graph_id": workflow_run.graph_id,
+            "status": workflow_run.status,
+            "final_state": result["final_state"],
+            "execution_logs": result["execution_log"],
+            "started_at": workflow_run.started_at,
+            "completed_at": workflow_run.completed_at,
+            "error_message": None
+        })
         
     except Exception as e:
         # Update run status to failed
+        db.rollback()
         workflow_run.status = RunStatus.FAILED
         workflow_run.error_message = str(e)
         db.commit()
@@ -314,7 +336,7 @@ def run_graph(run_request: RunRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/graph/run/async")
-async def run_graph_async(
+def run_graph_async(
     run_request: RunRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -325,6 +347,9 @@ async def run_graph_async(
     Returns immediately with run_id. Use GET /graph/state/{run_id}
     to check progress and results.
     
+    Declared sync so FastAPI runs its blocking database calls in the
+    threadpool instead of on the event loop.
+    
     Args:
         run_request: Run request with graph ID and initial state
         background_tasks: FastAPI background tasks
@@ -334,18 +359,19 @@ async def run_graph_async(
         Run ID and pending status
     """
     # Get graph
-    graph = db.query(Graph).filter(Graph.id == run_request.graph_id).first()
+    graph = db.get(Graph, run_request.graph_id)
     
     if not graph:
         raise HTTPException(status_code=404, detail=f"Graph '{run_request.graph_id}' not found")
     
     # Create workflow run with pending status
     workflow_run = WorkflowRun(
+        id=reserve_run_id(run_request, db),
         graph_id=graph.id,
         status=RunStatus.PENDING,
-        current_state=json.dumps(run_request.initial_state)
+        current_state=dumps(run_request.initial_state)
     )
-    db.add(workflow_run)
+    insert_run(db, workflow_run)
     db.commit()
     db.refresh(workflow_run)
     
@@ -368,47 +394,93 @@ async def run_graph_async(
 
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against the current ETag (RFC 9110).
+    
+    The header is "*" or a comma-separated list of entity tags, compared
+    weakly, i.e. ignoring any "W/" prefix.
+    
+    Args:
+        if_none_match: If-None-Match header value, if sent
+        etag: Current entity tag of the resource
+        
+    Returns:
+        True if the client's copy is current (respond with 304)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
 @router.get("/graph/state/{run_id}", response_model=StateResponse)
-def get_run_state(run_id: str, db: Session = Depends(get_db)):
+def get_run_state(
+    run_id: str,
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get the current state of a workflow run.
     
+    The ETag combines the run's status with its last logged step, so
+    pollers that send it back in If-None-Match get an empty 304 until the
+    run makes progress.
+    
     Args:
         run_id: Run ID
         db: Database session
+        if_none_match: ETag from a previous response, if any
         
     Returns:
-        Current state and execution logs
+        Current state and execution logs, or 304 Not Modified
     """
-    workflow_run = db.query(WorkflowRun).filter(WorkflowRun.id == run_id).first()
+    workflow_run = db.get(WorkflowRun, run_id)
     
     if not workflow_run:
         raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
     
-    # Get execution logs
-    logs = db.query(ExecutionLog).filter(ExecutionLog.run_id == run_id).order_by(ExecutionLog.step_number).all()
-    
-    return StateResponse(
-        run_id=workflow_run.id,
-        graph_id=workflow_run.graph_id,
-        status=workflow_run.status,
-        current_state=json.loads(workflow_run.current_state),
-        current_node=workflow_run.current_node,
-        execution_logs=[
-            ExecutionLogResponse(
-                node_name=log.node_name,
-                step_number=log.step_number,
-                state_before=json.loads(log.state_before),
-                state_after=json.loads(log.state_after),
-                executed_at=log.executed_at,
-                error=log.error
-            )
-            for log in logs
-        ],
-        started_at=workflow_run.started_at,
-        completed_at=workflow_run.completed_at,
-        error_message=workflow_run.error_message
-    )
+    last_step = db.execute(
+        select(func.max(ExecutionLog.step_number)).where(ExecutionLog.run_id == run_id)
+    ).scalar()
+    etag = f'"{workflow_run.id}-{workflow_run.status.value}-{last_step or 0}"'
+    if etag_matches(if_none_match, etag):
+        # Skip loading and replaying the logs entirely
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    # Get execution logs (column rows only, no ORM hydration); states are
+    # rebuilt by replaying the stored patches
+    logs = db.execute(
+        select(
+            ExecutionLog.node_name,
+            ExecutionLog.step_number,
+            ExecutionLog.state_before,
+            ExecutionLog.state_after,
+            ExecutionLog.state_patch,
+            ExecutionLog.executed_at,
+            ExecutionLog.error
+        )
+        .where(ExecutionLog.run_id == run_id)
+        .order_by(ExecutionLog.step_number)
+    ).mappings()
+    
+    # Payload is already JSON-safe, so serialize it directly with orjson
+    return ORJSONResponse({
+        "run_id": workflow_run.id,
+        "graph_id": workflow_run.graph_id,
+        "status": workflow_run.status,
+        "current_state": loads(workflow_run.current_state),
+        "current_node": workflow_run.current_node,
+        "execution_logs": list(replay_log_rows(logs)),
+        "started_at": workflow_run.started_at,
+        "completed_at": workflow_run.completed_at,
+        "error_message": workflow_run.error_message
+    }, headers={"ETag": etag})
 
 
 @router.get("/tools")
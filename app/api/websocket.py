@@ -3,22 +3,126 @@ WebSocket connection manager for streaming workflow execution logs.
 """
 
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set
-import json
+from collections import defaultdict
+from typing import Dict, List, Optional
 import asyncio
 
+from app.serialization import dumps
+
 
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time log streaming.
     
     Allows multiple clients to connect to the same workflow run
-    and receive execution updates in real-time.
+    and receive execution updates in real-time. Messages are queued as
+    pre-encoded JSON, and those for a run that arrive within a short
+    window are coalesced into a single {"type": "batch", "items": [...]}
+    frame without being re-encoded.
+    
+    Synchronous code (such as the workflow executor running in a worker
+    thread) hands messages over with publish(), which only enqueues them;
+    a single task on the event loop forwards them to the clients.
     """
     
-    def __init__(self):
-        """Initialize the connection manager."""
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    # Upper bounds for a single batch frame
+    MAX_BATCH_ITEMS = 128
+    MAX_BATCH_BYTES = 64 * 1024
+    
+    def __init__(self, flush_interval: float = 0.015):
+        """
+        Initialize the connection manager.
+        
+        Args:
+            flush_interval: Seconds to collect messages before sending them
+        """
+        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List[str]] = defaultdict(list)
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._drain_task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """
+        Start forwarding published messages on the running event loop.
+        
+        Safe to call more than once; must be called from the event loop.
+        """
+        if self._drain_task is not None and not self._drain_task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._outbox = asyncio.Queue()
+        self._drain_task = self._loop.create_task(self._drain())
+    
+    async def stop(self):
+        """Stop forwarding published messages and drop unsent ones."""
+        # Clear the loop first so concurrent publish() calls return early
+        self._loop = None
+        
+        tasks = list(self._flush_tasks.values())
+        if self._drain_task is not None:
+            tasks.append(self._drain_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self._flush_tasks.clear()
+        self._pending.clear()
+        self._drain_task = None
+        self._outbox = None
+    
+    def has_subscribers(self, run_id: str) -> bool:
+        """
+        Check whether published messages for a run would be delivered.
+        
+        Lets publishers skip building and encoding messages nobody reads.
+        
+        Args:
+            run_id: Workflow run ID
+            
+        Returns:
+            True if the manager is running and a client is connected to the run
+        """
+        return self._loop is not None and run_id in self.active_connections
+    
+    def publish(self, run_id: str, payload: str):
+        """
+        Enqueue a JSON-encoded log message from any thread without blocking.
+        
+        Messages are dropped if the manager has not been started or no
+        client is connected to the run.
+        
+        Args:
+            run_id: Workflow run ID
+            payload: JSON-encoded log message object
+        """
+        loop = self._loop
+        outbox = self._outbox
+        if loop is None or outbox is None or run_id not in self.active_connections:
+            return
+        try:
+            loop.call_soon_threadsafe(outbox.put_nowait, (run_id, payload))
+        except RuntimeError:
+            # Event loop already closed
+            pass
+    
+    async def _drain(self):
+        """
+        Forward published messages to their runs' clients.
+        
+        Waits for one message, then takes whatever else is already queued
+        (up to MAX_BATCH_ITEMS) in the same pass.
+        """
+        outbox = self._outbox
+        while True:
+            messages = [await outbox.get()]
+            while len(messages) < self.MAX_BATCH_ITEMS and not outbox.empty():
+                messages.append(outbox.get_nowait())
+            
+            for run_id, payload in messages:
+                await self.send_raw(run_id, payload)
     
     async def connect(self, run_id: str, websocket: WebSocket):
         """
@@ -28,17 +132,18 @@ class ConnectionManager:
             run_id: Workflow run ID
             websocket: WebSocket connection
         """
+        self.start()
         await websocket.accept()
-        if run_id not in self.active_connections:
-            self.active_connections[run_id] = set()
-        self.active_connections[run_id].add(websocket)
+        connections = self.active_connections.setdefault(run_id, [])
+        if websocket not in connections:
+            connections.append(websocket)
         
         # Send connection confirmation
-        await websocket.send_json({
+        await websocket.send_text(dumps({
             "type": "connected",
             "run_id": run_id,
             "message": f"Connected to workflow run {run_id}"
-        })
+        }))
     
     def disconnect(self, run_id: str, websocket: WebSocket):
         """
@@ -48,32 +153,117 @@ class ConnectionManager:
             run_id: Workflow run ID
             websocket: WebSocket connection to remove
         """
-        if run_id in self.active_connections:
-            self.active_connections[run_id].discard(websocket)
-            # Clean up empty sets
-            if not self.active_connections[run_id]:
+        connections = self.active_connections.get(run_id)
+        if connections is not None:
+            if websocket in connections:
+                connections.remove(websocket)
+            # Clean up empty lists
+            if not connections:
                 del self.active_connections[run_id]
     
     async def send_log(self, run_id: str, message: dict):
         """
-        Send a log message to all connected clients for a run.
+        Queue a log message for all connected clients for a run.
         
         Args:
             run_id: Workflow run ID
             message: Log message dictionary
         """
         if run_id in self.active_connections:
-            # Send to all connected clients
-            disconnected = set()
-            for connection in self.active_connections[run_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    # Mark for removal if send fails
-                    disconnected.add(connection)
+            await self.send_raw(run_id, dumps(message))
+    
+    async def send_raw(self, run_id: str, payload: str):
+        """
+        Queue an already JSON-encoded log message for a run.
+        
+        The message is sent on the next flush, together with any other
+        messages queued for the run in the meantime.
+        
+        Args:
+            run_id: Workflow run ID
+            payload: JSON-encoded log message object
+        """
+        if run_id in self.active_connections:
+            self._pending[run_id].append(payload)
+            if run_id not in self._flush_tasks:
+                self._flush_tasks[run_id] = asyncio.create_task(
+                    self._flush_after(run_id, self.flush_interval)
+                )
+    
+    async def _flush_after(self, run_id: str, delay: float):
+        """
+        Send all queued messages for a run after a delay.
+        
+        A single queued message is sent as-is; several are spliced into
+        batch frames of at most MAX_BATCH_ITEMS messages and roughly
+        MAX_BATCH_BYTES each.
+        
+        Args:
+            run_id: Workflow run ID
+            delay: Seconds to wait before flushing
+        """
+        await asyncio.sleep(delay)
+        self._flush_tasks.pop(run_id, None)
+        items = self._pending.pop(run_id, [])
+        
+        for batch in self._split_batches(items):
+            if len(batch) == 1:
+                payload = batch[0]
+            else:
+                payload = '{"type":"batch","items":[' + ",".join(batch) + "]}"
+            await self._broadcast(run_id, payload)
+    
+    def _split_batches(self, items: List[str]) -> List[List[str]]:
+        """
+        Split encoded messages into groups that fit in one batch frame.
+        
+        A message larger than MAX_BATCH_BYTES gets a group of its own.
+        
+        Args:
+            items: JSON-encoded messages in send order
             
-            # Remove disconnected clients
-            for connection in disconnected:
+        Returns:
+            List of message groups, in send order
+        """
+        batches = []
+        batch: List[str] = []
+        size = 0
+        
+        for item in items:
+            if batch and (len(batch) >= self.MAX_BATCH_ITEMS or size + len(item) > self.MAX_BATCH_BYTES):
+                batches.append(batch)
+                batch = []
+                size = 0
+            batch.append(item)
+            size += len(item) + 1
+        
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def _broadcast(self, run_id: str, payload: str):
+        """
+        Send an encoded message to all connected clients for a run concurrently.
+        
+        The same text frame is written to every client, so a slow client
+        does not delay the others.
+        
+        Args:
+            run_id: Workflow run ID
+            payload: JSON-encoded message
+        """
+        connections = list(self.active_connections.get(run_id, ()))
+        if not connections:
+            return
+        
+        results = await asyncio.gather(
+            *[connection.send_text(payload) for connection in connections],
+            return_exceptions=True
+        )
+        
+        # Remove clients whose send failed
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
                 self.disconnect(run_id, connection)
     
     def get_connection_count(self, run_id: str) -> int:
@@ -86,7 +276,7 @@ class ConnectionManager:
         Returns:
             Number of active connections
         """
-        return len(self.active_connections.get(run_id, set()))
+        return len(self.active_connections.get(run_id, ()))
 
 
 # Global connection manager instance
@@ -2,7 +2,7 @@
 Application configuration using Pydantic Settings.
 """
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
@@ -15,14 +15,15 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = "INFO"
     
+    # Execution logs: store a full state snapshot every N steps, JSON patches otherwise
+    log_snapshot_interval: int = 10
+    
     # API
     api_title: str = "StateFlow API"
     api_version: str = "0.1.0"
     api_description: str = "A minimal workflow engine for building agent workflows"
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
 
 # Global settings instance
@@ -2,7 +2,8 @@
 Database setup and session management using SQLAlchemy.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
@@ -11,13 +12,39 @@ from typing import Generator
 from app.config import settings
 
 
+# Dialect-specific engine options
+engine_options = {}
+if "sqlite" in settings.database_url:
+    engine_options["connect_args"] = {"check_same_thread": False}
+elif settings.database_url.startswith(("postgresql://", "postgresql+psycopg2://")):
+    # psycopg2: send executemany() batches (e.g. bulk log inserts) as multi-row VALUES
+    engine_options["executemany_mode"] = "values_plus_batch"
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-    echo=False
+    echo=False,
+    **engine_options
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Tune each new SQLite connection for write-heavy log persistence.
+        
+        WAL lets readers (state polling) run alongside the writer, and
+        synchronous=NORMAL keeps a WAL database consistent without an
+        fsync on every commit.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+        cursor.execute("PRAGMA busy_timeout=5000")  # ms
+        cursor.close()
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -54,8 +81,97 @@ def get_db_context() -> Generator[Session, None, None]:
         db.close()
 
 
+def use_async_commit(db: Session) -> None:
+    """
+    Let the current transaction commit without waiting for the WAL flush.
+    
+    Only applies to PostgreSQL (SET LOCAL synchronous_commit = OFF); a
+    crash may lose the last commits but never corrupts the database.
+    
+    Args:
+        db: Database session with an open transaction
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SET LOCAL synchronous_commit = OFF"))
+
+
+def _rebuild_sqlite_table(connection: Connection, table) -> None:
+    """
+    Recreate a SQLite table from its model definition, keeping its rows.
+    
+    SQLite cannot change column constraints in place, so the old table is
+    renamed, the new one created (with its indexes) and the shared
+    columns copied over.
+    
+    Args:
+        connection: Connection with an open transaction
+        table: SQLAlchemy Table to rebuild
+    """
+    old_name = f"_{table.name}_old"
+    old_columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    shared = ", ".join(f'"{column.name}"' for column in table.columns if column.name in old_columns)
+    
+    # Legacy rename keeps foreign keys in other tables pointing at the
+    # original name, i.e. at the rebuilt table
+    connection.execute(text("PRAGMA legacy_alter_table=ON"))
+    connection.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{old_name}"'))
+    connection.execute(text("PRAGMA legacy_alter_table=OFF"))
+    # Indexes move with the renamed table; drop them so the names are free
+    for index in inspect(connection).get_indexes(old_name):
+        connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+    table.create(connection)
+    connection.execute(text(
+        f'INSERT INTO "{table.name}" ({shared}) SELECT {shared} FROM "{old_name}"'
+    ))
+    connection.execute(text(f'DROP TABLE "{old_name}"'))
+
+
+def upgrade_schema(bind: Engine) -> None:
+    """
+    Bring tables created by older versions up to the current models.
+    
+    create_all() never alters existing tables, so this adds missing
+    columns, relaxes NOT NULL on columns the models now allow to be
+    NULL, and creates missing indexes. Safe to run on every startup.
+    
+    Args:
+        bind: Engine of the database to upgrade
+    """
+    with bind.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in columns]
+            relaxed = [
+                column for column in table.columns
+                if column.name in columns and column.nullable and not columns[column.name]["nullable"]
+            ]
+            
+            if relaxed and connection.dialect.name == "sqlite":
+                # The rebuild also creates the missing columns and indexes
+                _rebuild_sqlite_table(connection, table)
+                continue
+            
+            for column in missing:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            for column in relaxed:
+                connection.execute(text(f'ALTER TABLE "{table.name}" ALTER COLUMN "{column.name}" DROP NOT NULL'))
+            
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+
+
 def init_db() -> None:
     """
-    Initialize database by creating all tables.
+    Initialize database by creating all tables and upgrading older ones.
     """
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
@@ -2,15 +2,21 @@
 Workflow engine package containing state, node, graph, and executor components.
 """
 
-from app.engine.state import WorkflowState
+from app.engine.state import WorkflowState, WorkflowStateModel, make_state_patch, apply_state_patch
 from app.engine.node import Node, FunctionNode
-from app.engine.graph import WorkflowGraph
+from app.engine.graph import WorkflowGraph, CompiledPlan
 from app.engine.executor import WorkflowExecutor
+from app.engine.condition import compile_condition
 
 __all__ = [
     "WorkflowState",
+    "WorkflowStateModel",
+    "make_state_patch",
+    "apply_state_patch",
     "Node",
     "FunctionNode",
     "WorkflowGraph",
-    "WorkflowExecutor"
+    "CompiledPlan",
+    "WorkflowExecutor",
+    "compile_condition"
 ]
@@ -0,0 +1,110 @@
+"""
+Edge condition compilation.
+
+Conditions are Python expressions over state keys, such as
+"quality_score < threshold and iterations < max_iterations". They are
+compiled once into plain functions that index the state data directly,
+so evaluating an edge needs neither eval() nor a copy of the state.
+"""
+
+from typing import Callable
+from functools import lru_cache
+import ast
+
+from app.engine.state import WorkflowState
+
+
+# Expression nodes a condition may contain; anything else (calls,
+# attribute access, lambdas, comprehensions, ...) is rejected
+_ALLOWED_NODES = (
+    ast.Expression, ast.Load, ast.Name, ast.Constant,
+    ast.BoolOp, ast.And, ast.Or,
+    ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.IfExp, ast.Subscript, ast.Tuple, ast.List,
+)
+
+_STATE_ARG = "state"
+
+
+class _StateLookup(ast.NodeTransformer):
+    """Rewrite bare names into state.data["name"] lookups, recording the names."""
+    
+    def __init__(self):
+        self.names = set()
+    
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        self.names.add(node.id)
+        return ast.copy_location(
+            ast.Subscript(
+                value=ast.Attribute(
+                    value=ast.Name(id=_STATE_ARG, ctx=ast.Load()),
+                    attr="data",
+                    ctx=ast.Load()
+                ),
+                slice=ast.Constant(value=node.id),
+                ctx=ast.Load()
+            ),
+            node
+        )
+
+
+@lru_cache(maxsize=256)
+def compile_condition(source: str) -> Callable[[WorkflowState], bool]:
+    """
+    Compile a condition expression into a state predicate.
+    
+    Results are cached by source string, so identical conditions across
+    graphs share one function.
+    
+    Args:
+        source: Python expression over state keys
+        
+    Returns:
+        Function taking a WorkflowState and returning the expression value
+        
+    Raises:
+        SyntaxError: If the expression cannot be parsed
+        ValueError: If the expression uses unsupported constructs
+    """
+    tree = ast.parse(source, mode="eval")
+    
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(
+                f"Unsupported expression in condition '{source}': {type(node).__name__}"
+            )
+    
+    lookup = _StateLookup()
+    body = lookup.visit(tree.body)
+    state_names = frozenset(lookup.names)
+    function = ast.Expression(
+        body=ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=_STATE_ARG)],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[]
+            ),
+            body=body
+        )
+    )
+    ast.fix_missing_locations(function)
+    
+    predicate = eval(compile(function, "<edge_cond>", "eval"), {"__builtins__": {}})
+    
+    def condition(state: WorkflowState) -> bool:
+        try:
+            return predicate(state)
+        except KeyError as e:
+            # Only a missing state variable is a name error; KeyErrors from
+            # subscripts inside the expression propagate unchanged
+            key = e.args[0] if e.args else None
+            if key in state_names and key not in state.data:
+                raise NameError(f"name {key!r} is not defined in state") from None
+            raise
+    
+    return condition
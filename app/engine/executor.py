@@ -5,14 +5,31 @@ Handles sequential execution, branching, and looping.
 """
 
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
+import time
 from app.engine.graph import WorkflowGraph
-from app.engine.state import WorkflowState
+from app.engine.state import WorkflowState, make_state_patch
+from app.serialization import dumps
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _datetime_from_ns(timestamp_ns: int) -> datetime:
+    """Convert a time.time_ns() timestamp to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=timestamp_ns // 1000)
 
 
 class ExecutionStep:
-    """Represents a single execution step in the workflow."""
+    """
+    Represents a single execution step in the workflow.
+    
+    Successful steps are logged as plain dicts straight from the execute()
+    loop; this class is used to record failed steps.
+    
+    Steps are timestamped with time.time_ns(); executed_at is converted
+    to a naive UTC datetime only when it is read.
+    """
     
     def __init__(
         self,
@@ -27,7 +44,12 @@ class ExecutionStep:
         self.state_before = state_before
         self.state_after = state_after
         self.error = error
-        self.executed_at = datetime.utcnow()
+        self.executed_at_ns = time.time_ns()
+    
+    @property
+    def executed_at(self) -> datetime:
+        """Execution time as a naive UTC datetime."""
+        return _datetime_from_ns(self.executed_at_ns)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -37,7 +59,7 @@ class ExecutionStep:
             "state_before": self.state_before,
             "state_after": self.state_after,
             "error": self.error,
-            "executed_at": self.executed_at.isoformat()
+            "executed_at": self.executed_at
         }
 
 
@@ -64,23 +86,41 @@ class WorkflowExecutor:
         """
         self.graph = graph
         self.max_steps = max_steps
-        self.execution_log: List[ExecutionStep] = []
+        self.execution_log: List[Dict[str, Any]] = []
+        self.state_patches: List[List[Dict[str, Any]]] = []  # JSON Patch per log entry
         self.run_id = run_id
+        self._manager = None
+        
+        if run_id:
+            try:
+                from app.api.websocket import manager
+                self._manager = manager
+            except ImportError:
+                # Streaming not available (engine used without the API)
+                pass
     
-    async def _stream_log(self, message: dict):
+    def _is_streaming(self) -> bool:
+        """Check whether any WebSocket client currently receives this run's logs."""
+        return self._manager is not None and self._manager.has_subscribers(self.run_id)
+    
+    def _stream_log(self, message: Dict[str, Any]):
         """
-        Stream log message via WebSocket if run_id is set.
+        Stream a log message via WebSocket if a client is subscribed.
+        
+        The message is encoded here, in the executing thread, and handed
+        to the connection manager's queue without blocking. Streaming is
+        best-effort: failures are swallowed so they never fail the run.
         
         Args:
             message: Log message dictionary
         """
-        if self.run_id:
-            try:
-                from app.api.websocket import manager
-                await manager.send_log(self.run_id, message)
-            except Exception:
-                # Silently fail if streaming not available
-                pass
+        if not self._is_streaming():
+            return
+        try:
+            self._manager.publish(self.run_id, dumps(message))
+        except Exception:
+            # Silently fail if streaming not available
+            pass
     
     def execute(self, initial_state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -90,7 +130,9 @@ class WorkflowExecutor:
             initial_state: Initial state dictionary
             
         Returns:
-            Dictionary with final state and execution log
+            Dictionary with final state, execution log and the matching
+            per-step state patches (kept out of the log entries so those
+            can be returned to API clients as-is)
             
         Raises:
             ValueError: If graph is invalid or execution fails
@@ -107,119 +149,149 @@ class WorkflowExecutor:
         
         # Clear execution log
         self.execution_log = []
+        self.state_patches = []
         
-        # Execute workflow
-        while current_node_name is not None and step_number < self.max_steps:
-            step_number += 1
-            
-            # Get current node
-            node = self.graph.nodes[current_node_name]
-            
-            # Save state before execution
-            state_before = state.to_dict()
-            
-            try:
-                # Execute node
-                state = node.execute(state)
-                
-                # Save state after execution
-                state_after = state.to_dict()
+        # Bind per-step lookups to locals once, outside the hot loop
+        nodes = self.graph.nodes
+        get_next_node = self.graph.get_next_node
+        
+        # Unconditional chains are walked in order without evaluating edges;
+        # in branching graphs, only nodes without a fixed successor do so
+        plan = self.graph.compile()
+        chain = iter(plan.order[1:]) if plan.mode == "linear" else None
+        fixed_next = plan.next_node
+        log_step = self.execution_log.append
+        log_patch = self.state_patches.append
+        step_times: List[int] = []  # time.time_ns() per log entry
+        log_time = step_times.append
+        now_ns = time.time_ns
+        is_streaming = self._is_streaming
+        max_steps = self.max_steps
+        
+        # State entering the current step; each step's state_after copy is
+        # reused as the next step's state_before, so one copy is made per step
+        state_before = state.to_dict()
+        
+        # Execute workflow; a single handler around the loop records the
+        # failing step from the loop variables
+        try:
+            while current_node_name is not None and step_number < max_steps:
+                step_number += 1
                 
-                # Log execution
-                step = ExecutionStep(
-                    node_name=current_node_name,
-                    step_number=step_number,
-                    state_before=state_before,
-                    state_after=state_after
-                )
-                self.execution_log.append(step)
+                # Get current node
+                node = nodes[current_node_name]
                 
-                # Stream log via WebSocket if run_id is set
-                if self.run_id:
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_running():
-                            # Create task in existing loop
-                            asyncio.create_task(self._stream_log({
-                                "type": "step_complete",
-                                "step_number": step_number,
-                                "node_name": current_node_name,
-                                "state_after": state_after,
-                                "message": f"Completed step {step_number}: {current_node_name}"
-                            }))
-                        else:
-                            # Run in new loop
-                            loop.run_until_complete(self._stream_log({
-                                "type": "step_complete",
-                                "step_number": step_number,
-                                "node_name": current_node_name,
-                                "state_after": state_after,
-                                "message": f"Completed step {step_number}: {current_node_name}"
-                            }))
-                    except RuntimeError:
-                        # No event loop, try creating one
-                        try:
-                            asyncio.run(self._stream_log({
-                                "type": "step_complete",
-                                "step_number": step_number,
-                                "node_name": current_node_name,
-                                "state_after": state_after,
-                                "message": f"Completed step {step_number}: {current_node_name}"
-                            }))
-                        except:
-                            pass  # Skip streaming if async not available
+                # Execute node; nodes may also report the keys they changed
+                result = node.execute(state)
+                if type(result) is tuple:
+                    state, changed_keys = result
+                else:
+                    state, changed_keys = result, None
                 
-                # Get next node
-                current_node_name = self.graph.get_next_node(current_node_name, state)
+                # Save state after execution; steps that leave the state
+                # unchanged share the state_before dict instead of a copy
+                state_patch = make_state_patch(state_before, state.data, changed_keys)
+                state_after = state.to_dict() if state_patch else state_before
                 
-            except Exception as e:
-                # Log error
-                step = ExecutionStep(
-                    node_name=current_node_name,
-                    step_number=step_number,
-                    state_before=state_before,
-                    state_after=state_before,  # State unchanged on error
-                    error=str(e)
-                )
-                self.execution_log.append(step)
+                # Log execution
+                log_step({
+                    "node_name": current_node_name,
+                    "step_number": step_number,
+                    "state_before": state_before,
+                    "state_after": state_after,
+                    "error": None
+                })
+                log_patch(state_patch)
+                log_time(now_ns())
                 
-                # Stream error if WebSocket connected
-                if self.run_id:
-                    try:
-                        asyncio.run(self._stream_log({
-                            "type": "error",
-                            "step_number": step_number,
-                            "node_name": current_node_name,
-                            "error": str(e),
-                            "message": f"Error in step {step_number}: {str(e)}"
-                        }))
-                    except:
-                        pass
+                # Stream log via WebSocket; the message (and its state
+                # encoding) is only built when a client is subscribed
+                if is_streaming():
+                    self._stream_log({
+                        "type": "step_complete",
+                        "step_number": step_number,
+                        "node_name": current_node_name,
+                        "state_after": state_after,
+                        "message": f"Completed step {step_number}: {current_node_name}"
+                    })
                 
-                raise ValueError(f"Error executing node '{current_node_name}': {str(e)}")
+                # Get next node
+                if chain is not None:
+                    current_node_name = next(chain, None)
+                elif current_node_name in fixed_next:
+                    current_node_name = fixed_next[current_node_name]
+                else:
+                    current_node_name = get_next_node(current_node_name, state)
+                state_before = state_after
+        
+        except Exception as e:
+            # Log error
+            step = ExecutionStep(
+                node_name=current_node_name,
+                step_number=step_number,
+                state_before=state_before,
+                state_after=state_before,  # State unchanged on error
+                error=str(e)
+            )
+            log_step(step.to_dict())
+            log_patch([])
+            log_time(step.executed_at_ns)
+            
+            # Stream error if WebSocket connected
+            self._stream_log({
+                "type": "error",
+                "step_number": step_number,
+                "node_name": current_node_name,
+                "error": str(e),
+                "message": f"Error in step {step_number}: {str(e)}"
+            })
+            
+            raise ValueError(f"Error executing node '{current_node_name}': {str(e)}")
+        
+        finally:
+            # Step timestamps are converted once, outside the loop
+            for entry, timestamp_ns in zip(self.execution_log, step_times):
+                entry["executed_at"] = _datetime_from_ns(timestamp_ns)
         
         # Check if we hit max steps (possible infinite loop)
-        if step_number >= self.max_steps:
+        if step_number >= max_steps:
             raise ValueError(f"Workflow exceeded maximum steps ({self.max_steps}). Possible infinite loop.")
         
         # Stream completion message
-        if self.run_id:
-            try:
-                asyncio.run(self._stream_log({
-                    "type": "workflow_complete",
-                    "steps_executed": step_number,
-                    "final_state": state.to_dict(),
-                    "message": f"Workflow completed successfully in {step_number} steps"
-                }))
-            except:
-                pass
+        if is_streaming():
+            self._stream_log({
+                "type": "workflow_complete",
+                "steps_executed": step_number,
+                "final_state": state.to_dict(),
+                "message": f"Workflow completed successfully in {step_number} steps"
+            })
         
         return {
             "final_state": state.to_dict(),
-            "execution_log": [step.to_dict() for step in self.execution_log],
+            "execution_log": self.execution_log,
+            "state_patches": self.state_patches,
             "steps_executed": step_number
         }
     
+    async def execute_async(self, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute the workflow in a worker thread without blocking the event loop.
+        
+        Node functions are synchronous, so the whole run is handed to a
+        thread; step messages still reach WebSocket clients through the
+        connection manager while it runs.
+        
+        Args:
+            initial_state: Initial state dictionary
+            
+        Returns:
+            Same result as execute()
+            
+        Raises:
+            ValueError: If graph is invalid or execution fails
+        """
+        return await asyncio.to_thread(self.execute, initial_state)
+    
     def get_execution_log(self) -> List[Dict[str, Any]]:
         """Get the execution log."""
-        return [step.to_dict() for step in self.execution_log]
+        return self.execution_log
@@ -4,10 +4,49 @@ Workflow graph definition and management.
 A graph consists of nodes and edges that define the workflow structure.
 """
 
-from typing import Dict, List, Optional, Set, Callable, Any
+from typing import Dict, List, Optional, Set, Callable, Any, Tuple
 from app.engine.node import Node, FunctionNode
 from app.engine.state import WorkflowState
 
+# (to_node, condition) pair in a graph's adjacency table
+Transition = Tuple[str, Optional[Callable[[WorkflowState], bool]]]
+
+
+class CompiledPlan:
+    """
+    Traversal plan for a validated graph.
+    
+    A "linear" plan is an unconditional chain of nodes that can be run in
+    order without evaluating edges; a "branching" plan routes each step
+    through the graph's adjacency table, except for nodes whose successor
+    does not depend on state, which are listed in next_node.
+    """
+    
+    def __init__(
+        self,
+        mode: str,
+        order: Tuple[str, ...] = (),
+        adjacency: Optional[Dict[str, Tuple[Transition, ...]]] = None,
+        next_node: Optional[Dict[str, Optional[str]]] = None
+    ):
+        """
+        Initialize a plan.
+        
+        Args:
+            mode: "linear" or "branching"
+            order: Node names in execution order (linear plans)
+            adjacency: from_node -> transitions table (branching plans)
+            next_node: node -> fixed successor (None for end nodes) for nodes
+                with at most one, unconditional, outgoing edge (branching plans)
+        """
+        self.mode = mode
+        self.order = order
+        self.adjacency = adjacency or {}
+        self.next_node = next_node or {}
+    
+    def __repr__(self) -> str:
+        return f"CompiledPlan(mode='{self.mode}', nodes={len(self.order) or len(self.adjacency)})"
+
 
 class WorkflowGraph:
     """
@@ -17,6 +56,11 @@ class WorkflowGraph:
     - Simple edges (A -> B)
     - Conditional edges (A -> B if condition, else C)
     - Loops (A -> B -> A until condition)
+    
+    The adjacency table used by get_next_node() and the result of
+    validate() are computed on first use and reset whenever the graph
+    is modified through its methods. Cycles are detected as edges are
+    added.
     """
     
     def __init__(self, name: str, description: Optional[str] = None):
@@ -32,6 +76,57 @@ class WorkflowGraph:
         self.nodes: Dict[str, Node] = {}
         self.edges: Dict[str, List[Dict[str, Any]]] = {}  # from_node -> [edge_definitions]
         self.start_node: Optional[str] = None
+        self._node_index: Dict[str, int] = {}  # node name -> insertion index
+        self._adj_cache: Optional[Dict[str, Tuple[Transition, ...]]] = None
+        self._csr_cache: Optional[Tuple[List[int], List[int]]] = None
+        self._valid_cache: Optional[List[str]] = None
+        self._plan_cache: Optional[CompiledPlan] = None
+        self._has_cycle = False
+    
+    @property
+    def has_cycle(self) -> bool:
+        """Whether any edge closes a cycle (loops are allowed)."""
+        return self._has_cycle
+    
+    def _invalidate(self) -> None:
+        """Drop the cached adjacency tables, validation result and plan."""
+        self._adj_cache = None
+        self._csr_cache = None
+        self._valid_cache = None
+        self._plan_cache = None
+    
+    @property
+    def _adj(self) -> Dict[str, Tuple[Transition, ...]]:
+        """Adjacency table: from_node -> ((to_node, condition), ...) in edge order."""
+        if self._adj_cache is None:
+            self._adj_cache = {
+                from_node: tuple((edge["to"], edge.get("condition")) for edge in edges)
+                for from_node, edges in self.edges.items()
+            }
+        return self._adj_cache
+    
+    @property
+    def _csr(self) -> Tuple[List[int], List[int]]:
+        """
+        Index-based (CSR) adjacency for reachability checks: (offsets, targets).
+        
+        The edges of the node with index i are targets[offsets[i]:offsets[i + 1]];
+        edges touching unknown nodes are left out.
+        """
+        if self._csr_cache is None:
+            node_index = self._node_index
+            offsets = [0]
+            targets: List[int] = []
+            
+            for name in node_index:
+                for edge in self.edges.get(name, ()):
+                    to_index = node_index.get(edge["to"])
+                    if to_index is not None:
+                        targets.append(to_index)
+                offsets.append(len(targets))
+            
+            self._csr_cache = (offsets, targets)
+        return self._csr_cache
     
     def add_node(self, node: Node) -> None:
         """
@@ -43,6 +138,8 @@ class WorkflowGraph:
         if node.name in self.nodes:
             raise ValueError(f"Node '{node.name}' already exists in graph")
         self.nodes[node.name] = node
+        self._node_index[node.name] = len(self._node_index)
+        self._invalidate()
         
         # Set as start node if it's the first node
         if self.start_node is None:
@@ -67,6 +164,10 @@ class WorkflowGraph:
         if to_node not in self.nodes:
             raise ValueError(f"Destination node '{to_node}' not found in graph")
         
+        # An edge closes a cycle if its source is reachable from its target
+        if not self._has_cycle and self._reaches(to_node, from_node):
+            self._has_cycle = True
+        
         if from_node not in self.edges:
             self.edges[from_node] = []
         
@@ -74,6 +175,33 @@ class WorkflowGraph:
             "to": to_node,
             "condition": condition
         })
+        self._invalidate()
+    
+    def _reaches(self, source: str, target: str) -> bool:
+        """
+        Check whether target is reachable from source along existing edges.
+        
+        Args:
+            source: Node to start the search from
+            target: Node to look for
+            
+        Returns:
+            True if a path exists (including source == target)
+        """
+        if source == target:
+            return True
+        
+        visited = {source}
+        stack = [source]
+        while stack:
+            for edge in self.edges.get(stack.pop(), ()):
+                to_node = edge["to"]
+                if to_node == target:
+                    return True
+                if to_node not in visited:
+                    visited.add(to_node)
+                    stack.append(to_node)
+        return False
     
     def set_start_node(self, node_name: str) -> None:
         """
@@ -85,6 +213,7 @@ class WorkflowGraph:
         if node_name not in self.nodes:
             raise ValueError(f"Node '{node_name}' not found in graph")
         self.start_node = node_name
+        self._invalidate()
     
     def get_next_node(self, current_node: str, state: WorkflowState) -> Optional[str]:
         """
@@ -97,20 +226,56 @@ class WorkflowGraph:
         Returns:
             Next node name, or None if no next node (end of workflow)
         """
-        if current_node not in self.edges:
-            return None
-        
         # Check edges in order
-        for edge in self.edges[current_node]:
-            condition = edge.get("condition")
-            
+        for to_node, condition in self._adj.get(current_node, ()):
             # If no condition, or condition is True, follow this edge
             if condition is None or condition(state):
-                return edge["to"]
+                return to_node
         
         # No matching edge found
         return None
     
+    def compile(self) -> CompiledPlan:
+        """
+        Compile the graph into a traversal plan.
+        
+        The graph is linear when it has no cycle and, starting from the
+        start node, every node has at most one outgoing edge, and that
+        edge is unconditional.
+        
+        Returns:
+            Cached plan for the current graph structure
+        """
+        if self._plan_cache is None:
+            adj = self._adj
+            order = []
+            current = self.start_node
+            linear = current is not None and not self._has_cycle
+            
+            while linear and current is not None:
+                order.append(current)
+                
+                transitions = adj.get(current, ())
+                if not transitions:
+                    current = None
+                elif len(transitions) == 1 and transitions[0][1] is None:
+                    current = transitions[0][0]
+                else:
+                    linear = False
+            
+            if linear:
+                self._plan_cache = CompiledPlan("linear", order=tuple(order))
+            else:
+                next_node = {}
+                for name in self.nodes:
+                    transitions = adj.get(name, ())
+                    if not transitions:
+                        next_node[name] = None
+                    elif len(transitions) == 1 and transitions[0][1] is None:
+                        next_node[name] = transitions[0][0]
+                self._plan_cache = CompiledPlan("branching", adjacency=adj, next_node=next_node)
+        return self._plan_cache
+    
     def validate(self) -> List[str]:
         """
         Validate the graph structure.
@@ -118,6 +283,12 @@ class WorkflowGraph:
         Returns:
             List of validation errors (empty if valid)
         """
+        if self._valid_cache is None:
+            self._valid_cache = self._compute_validation_errors()
+        return list(self._valid_cache)
+    
+    def _compute_validation_errors(self) -> List[str]:
+        """Run the validation checks for validate()."""
         errors = []
         
         # Check if graph has nodes
@@ -131,15 +302,25 @@ class WorkflowGraph:
         elif self.start_node not in self.nodes:
             errors.append(f"Start node '{self.start_node}' not found in graph")
         
-        # Check for orphaned nodes (nodes with no incoming edges except start)
-        nodes_with_incoming = {self.start_node}
-        for from_node, edges in self.edges.items():
-            for edge in edges:
-                nodes_with_incoming.add(edge["to"])
-        
-        orphaned = set(self.nodes.keys()) - nodes_with_incoming
-        if orphaned:
-            errors.append(f"Orphaned nodes (no incoming edges): {orphaned}")
+        # Check for unreachable nodes with an iterative DFS from the start node
+        if self.start_node in self.nodes:
+            node_index = self._node_index
+            offsets, targets = self._csr
+            start = node_index[self.start_node]
+            visited = bytearray(len(node_index))
+            visited[start] = 1
+            stack = [start]
+            
+            while stack:
+                index = stack.pop()
+                for to_index in targets[offsets[index]:offsets[index + 1]]:
+                    if not visited[to_index]:
+                        visited[to_index] = 1
+                        stack.append(to_index)
+            
+            unreachable = [name for name, index in node_index.items() if not visited[index]]
+            if unreachable:
+                errors.append(f"Unreachable nodes (not reachable from start node): {unreachable}")
         
         # Check for edges referencing non-existent nodes
         for from_node, edges in self.edges.items():
@@ -5,7 +5,7 @@ Each node is a unit of work that reads and modifies the workflow state.
 """
 
 from abc import ABC, abstractmethod
-from typing import Callable, Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Set, Tuple, Union
 from app.engine.state import WorkflowState
 
 
@@ -28,7 +28,7 @@ class Node(ABC):
         self.description = description or f"Node: {name}"
     
     @abstractmethod
-    def execute(self, state: WorkflowState) -> WorkflowState:
+    def execute(self, state: WorkflowState) -> Union[WorkflowState, Tuple[WorkflowState, Optional[Set[str]]]]:
         """
         Execute the node's logic.
         
@@ -36,7 +36,9 @@ class Node(ABC):
             state: Current workflow state
             
         Returns:
-            Modified workflow state
+            Modified workflow state, or a (state, changed_keys) tuple when
+            the node knows which top-level keys it added, replaced or
+            removed, which lets the executor skip diffing the rest
         """
         pass
     
@@ -48,14 +50,17 @@ class FunctionNode(Node):
     """
     A node that wraps a Python function.
     
-    The function should accept a state dictionary and return a modified state dictionary.
+    The function should accept a state dictionary and return a modified state
+    dictionary, or, for delta functions, a dictionary of just the keys it sets,
+    which is merged into the state.
     """
     
     def __init__(
         self,
         name: str,
         function: Callable[[Dict[str, Any]], Dict[str, Any]],
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        returns_delta: Optional[bool] = None
     ):
         """
         Initialize a function node.
@@ -64,11 +69,17 @@ class FunctionNode(Node):
             name: Unique name of the node
             function: Function to execute (takes state dict, returns state dict)
             description: Optional description
+            returns_delta: Whether the function returns only the keys it sets
+                (defaults to the function's returns_delta attribute, which
+                the tool decorator sets)
         """
         super().__init__(name, description)
         self.function = function
+        if returns_delta is None:
+            returns_delta = getattr(function, "returns_delta", False)
+        self.returns_delta = returns_delta
     
-    def execute(self, state: WorkflowState) -> WorkflowState:
+    def execute(self, state: WorkflowState) -> Union[WorkflowState, Tuple[WorkflowState, Set[str]]]:
         """
         Execute the wrapped function.
         
@@ -76,13 +87,21 @@ class FunctionNode(Node):
             state: Current workflow state
             
         Returns:
-            Modified workflow state
+            Modified workflow state; for delta functions, together with
+            the set of keys the delta changed
         """
-        # Get current state as dict
-        state_dict = state.to_dict()
+        if self.returns_delta:
+            # The function only reads the state; merge what it returns
+            delta = self.function(state.data)
+            state.update(delta)
+            return state, set(delta)
         
-        # Execute function
-        result = self.function(state_dict)
+        # Execute function; nodes work on the state dict directly, the
+        # executor keeps its own copy of the state from before the step
+        result = self.function(state.data)
         
-        # Return updated state
-        return WorkflowState.from_dict(result)
+        # Functions usually mutate and return the same dict; only rebind
+        # the state when a new dict comes back
+        if result is not state.data:
+            state.reset(result)
+        return state
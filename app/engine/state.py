@@ -4,21 +4,38 @@ Workflow state management.
 The state is a dictionary that flows through the workflow, being modified by each node.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterable, List, Mapping, Optional
 from pydantic import BaseModel, Field
-from copy import deepcopy
-import json
+from copy import copy, deepcopy
 
+from app.serialization import dumps, loads
 
-class WorkflowState(BaseModel):
+
+class WorkflowState:
     """
     Base class for workflow state.
     
     State is a flexible dictionary that can hold any data needed by the workflow.
     Each node reads from and writes to this state.
+    
+    This is a thin wrapper around a plain dict, kept free of validation so
+    it can be passed between nodes on every step; use WorkflowStateModel
+    where state crosses the API boundary.
+    
+    Copies (including the executor's per-step log states) are shallow, so
+    nested containers must not be modified in place; use mutate() instead.
     """
     
-    data: Dict[str, Any] = Field(default_factory=dict, description="State data")
+    __slots__ = ("data",)
+    
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        """
+        Initialize state around a dictionary.
+        
+        Args:
+            data: State data, used as-is without copying
+        """
+        self.data: Dict[str, Any] = data if data is not None else {}
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get a value from the state."""
@@ -32,9 +49,42 @@ class WorkflowState(BaseModel):
         """Update multiple values in the state."""
         self.data.update(updates)
     
+    def reset(self, data: Dict[str, Any]) -> None:
+        """
+        Replace the state data in place, without copying it.
+        
+        Args:
+            data: New state data
+        """
+        self.data = data
+    
+    def mutate(self, key: str, fn: Callable[[Any], Any]) -> None:
+        """
+        Modify a nested value in place without affecting copies.
+        
+        The value is shallow-copied before fn is applied, so containers
+        shared with earlier copies stay untouched.
+        
+        Args:
+            key: Key of the value to modify
+            fn: Function that mutates the (copied) value in place
+        """
+        value = copy(self.data[key])
+        fn(value)
+        self.data[key] = value
+    
     def copy(self) -> "WorkflowState":
+        """
+        Create a shallow copy of the state.
+        
+        Nested values are shared with the copy; use mutate() (or replace
+        the value) rather than changing them in place.
+        """
+        return WorkflowState(self.data.copy())
+    
+    def deepcopy(self) -> "WorkflowState":
         """Create a deep copy of the state."""
-        return WorkflowState(data=deepcopy(self.data))
+        return WorkflowState(deepcopy(self.data))
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert state to dictionary."""
@@ -42,20 +92,127 @@ class WorkflowState(BaseModel):
     
     def to_json(self) -> str:
         """Convert state to JSON string."""
-        return json.dumps(self.data)
+        return dumps(self.data)
+    
+    def to_model(self) -> "WorkflowStateModel":
+        """Convert state to its validated Pydantic model."""
+        return WorkflowStateModel(data=self.data)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "WorkflowState":
-        """Create state from dictionary."""
-        return cls(data=data)
+        """Create state from a (shallow-copied) dictionary."""
+        return cls(dict(data))
     
     @classmethod
     def from_json(cls, json_str: str) -> "WorkflowState":
         """Create state from JSON string."""
-        return cls(data=json.loads(json_str))
+        return cls(loads(json_str))
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, WorkflowState):
+            return NotImplemented
+        return self.data == other.data
     
     def __repr__(self) -> str:
         return f"WorkflowState({self.data})"
+
+
+class WorkflowStateModel(BaseModel):
+    """
+    Pydantic model of workflow state, for validation at API boundaries.
+    """
+    
+    data: Dict[str, Any] = Field(default_factory=dict, description="State data")
+    
+    def to_state(self) -> WorkflowState:
+        """Convert the model to a workflow state."""
+        return WorkflowState.from_dict(self.data)
+
+
+def _escape_pointer(key: str) -> str:
+    """Escape a key for use as a JSON Pointer token (RFC 6901)."""
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape_pointer(token: str) -> str:
+    """Unescape a JSON Pointer token (RFC 6901)."""
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_state_patch(
+    before: Mapping[str, Any],
+    after: Mapping[str, Any],
+    keys: Optional[Iterable[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Compute a JSON Patch (RFC 6902) turning one state into another.
+    
+    Nodes replace top-level keys, so the diff is taken at the top level
+    only: changed values are carried whole in "add"/"replace" operations.
+    
+    Args:
+        before: State before the step
+        after: State after the step
+        keys: Optional keys known to have changed; when given, only these
+            are compared instead of every key in both states
+        
+    Returns:
+        List of JSON Patch operations (empty if nothing changed)
+    """
+    patch = []
+    
+    if keys is not None:
+        for key in keys:
+            if key not in after:
+                if key in before:
+                    patch.append({"op": "remove", "path": "/" + _escape_pointer(key)})
+            elif key not in before:
+                patch.append({"op": "add", "path": "/" + _escape_pointer(key), "value": after[key]})
+            else:
+                old_value, value = before[key], after[key]
+                if old_value is not value and old_value != value:
+                    patch.append({"op": "replace", "path": "/" + _escape_pointer(key), "value": value})
+        return patch
+    
+    for key in before:
+        if key not in after:
+            patch.append({"op": "remove", "path": "/" + _escape_pointer(key)})
+    
+    for key, value in after.items():
+        if key not in before:
+            patch.append({"op": "add", "path": "/" + _escape_pointer(key), "value": value})
+        else:
+            old_value = before[key]
+            if old_value is not value and old_value != value:
+                patch.append({"op": "replace", "path": "/" + _escape_pointer(key), "value": value})
+    
+    return patch
+
+
+def apply_state_patch(state: Mapping[str, Any], patch: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply a top-level JSON Patch produced by make_state_patch().
+    
+    Args:
+        state: State to patch (left unchanged)
+        patch: List of JSON Patch operations
+        
+    Returns:
+        New patched state dictionary
+        
+    Raises:
+        ValueError: If the patch contains an unsupported operation
+    """
+    result = dict(state)
+    
+    for operation in patch:
+        op = operation["op"]
+        key = _unescape_pointer(operation["path"][1:])
+        if op == "remove":
+            result.pop(key, None)
+        elif op in ("add", "replace"):
+            result[key] = operation["value"]
+        else:
+            raise ValueError(f"Unsupported state patch operation: {op}")
     
-    class Config:
-        arbitrary_types_allowed = True
+    return result
@@ -3,12 +3,14 @@ FastAPI application entry point.
 """
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.database import init_db
 from app.api.routes import router
+from app.api.websocket import manager
 # Import tools to register them
 import app.tools.code_review_tools
 
@@ -22,11 +24,13 @@ async def lifespan(app: FastAPI):
     print("Initializing database...")
     init_db()
     print("Database initialized successfully!")
+    manager.start()
     
     yield
     
     # Shutdown
     print("Shutting down...")
+    await manager.stop()
 
 
 # Create FastAPI application
@@ -34,6 +38,7 @@ app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
     description=settings.api_description,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
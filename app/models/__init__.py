@@ -2,10 +2,12 @@
 Models package containing database models and Pydantic schemas.
 """
 
-from app.models.db_models import Graph, WorkflowRun, ExecutionLog, RunStatus as DBRunStatus
+from app.models.db_models import generate_uuid, Graph, WorkflowRun, ExecutionLog, RunStatus as DBRunStatus
 from app.models.schemas import (
     NodeDefinition,
     EdgeDefinition,
+    NODE_LIST_ADAPTER,
+    EDGE_LIST_ADAPTER,
     GraphCreate,
     GraphResponse,
     GraphDetail,
@@ -18,6 +20,7 @@ from app.models.schemas import (
 
 __all__ = [
     # Database models
+    "generate_uuid",
     "Graph",
     "WorkflowRun",
     "ExecutionLog",
@@ -25,6 +28,8 @@ __all__ = [
     # Pydantic schemas
     "NodeDefinition",
     "EdgeDefinition",
+    "NODE_LIST_ADAPTER",
+    "EDGE_LIST_ADAPTER",
     "GraphCreate",
     "GraphResponse",
     "GraphDetail",
@@ -2,7 +2,7 @@
 SQLAlchemy database models for storing graphs, workflow runs, and execution logs.
 """
 
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -73,13 +73,18 @@ class ExecutionLog(Base):
     Each log entry represents one node execution.
     """
     __tablename__ = "execution_logs"
+    __table_args__ = (
+        # Serves the per-run lookup ordered by step
+        Index("ix_execution_logs_run_id_step_number", "run_id", "step_number"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     run_id = Column(String, ForeignKey("workflow_runs.id"), nullable=False)
     node_name = Column(String, nullable=False)
     step_number = Column(Integer, nullable=False)
-    state_before = Column(Text, nullable=False)  # JSON string
-    state_after = Column(Text, nullable=False)  # JSON string
+    state_before = Column(Text, nullable=True)  # JSON string, full snapshot every N steps
+    state_after = Column(Text, nullable=True)  # JSON string, only on rows written before state_patch
+    state_patch = Column(Text, nullable=True)  # JSON Patch from state_before to state_after
     executed_at = Column(DateTime, default=datetime.utcnow)
     error = Column(Text, nullable=True)
     
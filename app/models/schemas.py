@@ -2,7 +2,7 @@
 Pydantic models for API request/response validation.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from enum import Enum
@@ -30,6 +30,11 @@ class EdgeDefinition(BaseModel):
     condition: Optional[str] = Field(None, description="Optional condition for conditional routing")
 
 
+# Parse and validate stored node/edge JSON in a single pass
+NODE_LIST_ADAPTER = TypeAdapter(List[NodeDefinition])
+EDGE_LIST_ADAPTER = TypeAdapter(List[EdgeDefinition])
+
+
 class GraphCreate(BaseModel):
     """Request model for creating a new graph."""
     name: str = Field(..., description="Name of the graph")
@@ -37,20 +42,19 @@ class GraphCreate(BaseModel):
     nodes: List[NodeDefinition] = Field(..., description="List of nodes in the graph")
     edges: List[EdgeDefinition] = Field(..., description="List of edges connecting nodes")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "name": "code_review_workflow",
-                "description": "A workflow for reviewing code quality",
-                "nodes": [
-                    {"name": "extract_functions", "function": "extract_functions"},
-                    {"name": "check_complexity", "function": "check_complexity"}
-                ],
-                "edges": [
-                    {"from_node": "extract_functions", "to_node": "check_complexity"}
-                ]
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "name": "code_review_workflow",
+            "description": "A workflow for reviewing code quality",
+            "nodes": [
+                {"name": "extract_functions", "function": "extract_functions"},
+                {"name": "check_complexity", "function": "check_complexity"}
+            ],
+            "edges": [
+                {"from_node": "extract_functions", "to_node": "check_complexity"}
+            ]
         }
+    })
 
 
 class GraphResponse(BaseModel):
@@ -60,8 +64,7 @@ class GraphResponse(BaseModel):
     description: Optional[str]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class GraphDetail(BaseModel):
@@ -79,18 +82,23 @@ class RunRequest(BaseModel):
     """Request model for running a workflow."""
     graph_id: str = Field(..., description="ID of the graph to run")
     initial_state: Dict[str, Any] = Field(..., description="Initial state for the workflow")
+    run_id: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=64,
+        description="Client-chosen run ID, so WS /ws/run/{run_id} can be opened before the run starts"
+    )
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "graph_id": "123e4567-e89b-12d3-a456-426614174000",
-                "initial_state": {
-                    "code": "def example(): pass",
-                    "threshold": 70,
-                    "max_iterations": 3
-                }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "graph_id": "123e4567-e89b-12d3-a456-426614174000",
+            "initial_state": {
+                "code": "def example(): pass",
+                "threshold": 70,
+                "max_iterations": 3
             }
         }
+    })
 
 
 class ExecutionLogResponse(BaseModel):
@@ -102,8 +110,7 @@ class ExecutionLogResponse(BaseModel):
     executed_at: datetime
     error: Optional[str]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class RunResponse(BaseModel):
@@ -117,8 +124,7 @@ class RunResponse(BaseModel):
     completed_at: Optional[datetime]
     error_message: Optional[str]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class StateResponse(BaseModel):
@@ -133,5 +139,4 @@ class StateResponse(BaseModel):
     completed_at: Optional[datetime]
     error_message: Optional[str]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,37 @@
+"""
+JSON serialization helpers backed by orjson.
+
+Used for everything persisted to or read from the database JSON columns.
+"""
+
+from typing import Any, Union
+import orjson
+
+
+def dumps(obj: Any) -> str:
+    """
+    Serialize an object to a JSON string.
+    
+    Non-string dict keys are coerced to strings, matching the stdlib
+    json behaviour the stored data was originally written with.
+    
+    Args:
+        obj: JSON-compatible object
+        
+    Returns:
+        JSON string
+    """
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserialize a JSON string or bytes.
+    
+    Args:
+        data: JSON document
+        
+    Returns:
+        Parsed object
+    """
+    return orjson.loads(data)
@@ -0,0 +1,116 @@
+"""
+Single-pass AST analysis shared by the code review tools.
+
+CodeAnalyzer walks a parsed module once and collects everything the
+review tools need (function definitions, control structure counts and
+the inputs of the issue checks), so each tool reads its fields instead
+of walking the tree again.
+"""
+
+from typing import Dict, List, Sequence
+import ast
+import re
+
+# Module-level UPPER_CASE names count as globals
+_CONSTANT_NAME_RE = re.compile(r'[A-Z_][A-Z0-9_]*')
+
+
+class CodeAnalyzer(ast.NodeVisitor):
+    """
+    Collect code review metrics in one traversal of a module AST.
+    
+    Attributes:
+        functions: (Async) function definitions in source order
+        counts: Control structure counts keyed by "if", "else", "for" and "while"
+        has_bare_except: Whether any "except:" clause catches everything
+        global_count: Number of module-level assignments to UPPER_CASE names
+        documented_count: Number of functions with a docstring
+    """
+    
+    def __init__(self, lines: Sequence[str]):
+        """
+        Initialize an analyzer.
+        
+        Args:
+            lines: Source lines of the code being analysed (used to tell
+                "elif" apart from a nested "if" in an "else" block)
+        """
+        self.lines = lines
+        self.functions: List[ast.AST] = []
+        self.counts: Dict[str, int] = {"if": 0, "else": 0, "for": 0, "while": 0}
+        self.has_bare_except = False
+        self.global_count = 0
+        self.documented_count = 0
+    
+    def run(self, tree: ast.Module) -> "CodeAnalyzer":
+        """
+        Analyse a module.
+        
+        Args:
+            tree: Parsed module
+        
+        Returns:
+            This analyzer, with all fields populated
+        """
+        self.visit(tree)
+        self.functions.sort(key=lambda node: (node.lineno, node.col_offset))
+        return self
+    
+    def visit_Module(self, node: ast.Module) -> None:
+        for statement in node.body:
+            if isinstance(statement, ast.Assign) and any(
+                isinstance(target, ast.Name) and _CONSTANT_NAME_RE.fullmatch(target.id)
+                for target in statement.targets
+            ):
+                self.global_count += 1
+        self.generic_visit(node)
+    
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        self.functions.append(node)
+        if ast.get_docstring(node) is not None:
+            self.documented_count += 1
+        self.generic_visit(node)
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def visit_If(self, node: ast.If) -> None:
+        self.counts["if"] += 1
+        orelse = node.orelse
+        if orelse and not (
+            len(orelse) == 1
+            and isinstance(orelse[0], ast.If)
+            and self.lines[orelse[0].lineno - 1].encode()[orelse[0].col_offset:].startswith(b"elif")
+        ):
+            self.counts["else"] += 1
+        self.generic_visit(node)
+    
+    def visit_IfExp(self, node: ast.IfExp) -> None:
+        self.counts["if"] += 1
+        self.counts["else"] += 1
+        self.generic_visit(node)
+    
+    def visit_For(self, node: ast.AST) -> None:
+        self.counts["for"] += 1
+        self.counts["else"] += bool(node.orelse)
+        self.generic_visit(node)
+    
+    visit_AsyncFor = visit_For
+    
+    def visit_While(self, node: ast.While) -> None:
+        self.counts["while"] += 1
+        self.counts["else"] += bool(node.orelse)
+        self.generic_visit(node)
+    
+    def visit_Try(self, node: ast.Try) -> None:
+        self.counts["else"] += bool(node.orelse)
+        self.generic_visit(node)
+    
+    def visit_comprehension(self, node: ast.comprehension) -> None:
+        self.counts["for"] += 1
+        self.counts["if"] += len(node.ifs)
+        self.generic_visit(node)
+    
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type is None:
+            self.has_bare_except = True
+        self.generic_visit(node)
@@ -2,14 +2,137 @@
 Sample tools for code review workflow.
 
 These tools analyze Python code for quality, complexity, and issues.
+
+Each distinct code string is analysed once (a single ast pass, with
+approximate regex scans for code that does not parse) and the tools read
+their metrics from the one cached analysis.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+import ast
 import re
+from app.tools.ast_analyzer import CodeAnalyzer
 from app.tools.registry import tool
 
+# Regex fallbacks for code that does not parse, compiled once per process
+_FUNC_DEF_RE = re.compile(r'def\s+(\w+)\s*\([^)]*\):')  # def function_name(params):
+_KW_RE = re.compile(r'\b(if|else|for|while)\b')  # control structure keywords
+_BARE_EXCEPT_RE = re.compile(r'except\s*:')
+_GLOBAL_RE = re.compile(r'^[A-Z_][A-Z0-9_]*\s*=', re.MULTILINE)
+_DOCSTR_RE = re.compile(r'def\s+\w+\s*\([^)]*\):\s*"""')
+
+# Quality score deduction per issue severity
+_SEVERITY_PENALTY = {"high": 15, "medium": 10, "low": 5}
+
+
+# Suggestion text per issue type, in the order suggestions are reported
+_SUGGESTIONS = {
+    "bare_except": "Replace bare 'except:' with specific exception types (e.g., 'except ValueError:')",
+    "missing_docstrings": "Add docstrings to all functions describing their purpose, parameters, and return values",
+    "long_lines": "Break long lines into multiple lines for better readability (PEP 8 recommends max 79 characters)",
+    "long_file": "Consider splitting this file into smaller, focused modules",
+    "too_many_globals": "Reduce global variables by encapsulating them in classes or functions",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class _CodeAnalysis:
+    """Metrics of one code string, as held in the analysis cache (no AST is kept)."""
+    functions: Tuple[Tuple[str, int, int], ...]  # (name, line number, start offset)
+    counts: Dict[str, int]  # control structures; treat as read-only
+    has_bare_except: bool
+    global_count: int
+    documented_count: int
+    code_lines: int  # non-blank, non-comment lines
+    non_blank_lines: int
+    long_line_count: int
 
-@tool(name="extract_functions", description="Extract function definitions from Python code")
+
+def _newline_offsets(code: str) -> List[int]:
+    """
+    Find the positions of all newline characters in code.
+    
+    Args:
+        code: Python source code
+        
+    Returns:
+        Sorted list of newline offsets, for line lookups with bisect
+    """
+    offsets = []
+    position = code.find('\n')
+    while position != -1:
+        offsets.append(position)
+        position = code.find('\n', position + 1)
+    return offsets
+
+
+@lru_cache(maxsize=32)
+def _analyze(code: str) -> _CodeAnalysis:
+    """
+    Analyse code once, shared by all tools (and review loop passes) over
+    the same code.
+    
+    Code that does not parse is measured with the regex fallbacks.
+    
+    Args:
+        code: Python source code
+        
+    Returns:
+        Immutable analysis of the code
+    """
+    lines = code.split('\n')
+    newlines = _newline_offsets(code)
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        tree = None
+    
+    if tree is not None:
+        analyzer = CodeAnalyzer(lines).run(tree)
+        functions = []
+        for node in analyzer.functions:
+            # col_offset counts UTF-8 bytes; convert it to a character offset
+            line_start = newlines[node.lineno - 2] + 1 if node.lineno > 1 else 0
+            column = len(lines[node.lineno - 1].encode()[:node.col_offset].decode(errors="ignore"))
+            functions.append((node.name, node.lineno, line_start + column))
+        counts = analyzer.counts
+        has_bare_except = analyzer.has_bare_except
+        # Module-level assignments to UPPER_CASE names
+        global_count = analyzer.global_count
+        documented_count = analyzer.documented_count
+    else:
+        # Line number = newlines before the match + 1
+        functions = [
+            (match.group(1), bisect_right(newlines, match.start()) + 1, match.start())
+            for match in _FUNC_DEF_RE.finditer(code)
+        ]
+        counts = {"if": 0, "else": 0, "for": 0, "while": 0}
+        for match in _KW_RE.finditer(code):
+            counts[match.group(1)] += 1
+        has_bare_except = _BARE_EXCEPT_RE.search(code) is not None
+        global_count = sum(1 for _ in _GLOBAL_RE.finditer(code))
+        documented_count = sum(1 for _ in _DOCSTR_RE.finditer(code))
+    
+    return _CodeAnalysis(
+        functions=tuple(functions),
+        counts=counts,
+        has_bare_except=has_bare_except,
+        global_count=global_count,
+        documented_count=documented_count,
+        code_lines=sum(
+            1 for line in lines
+            if (stripped := line.strip()) and not stripped.startswith('#')
+        ),
+        # isspace() avoids strip() copies
+        non_blank_lines=sum(1 for line in lines if line and not line.isspace()),
+        long_line_count=sum(len(line) > 100 for line in lines),
+    )
+
+
+@tool(name="extract_functions", description="Extract function definitions from Python code", returns_delta=True)
 def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Extract function definitions from Python code.
@@ -18,36 +141,47 @@ def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
         state: Must contain 'code' key with Python code string
         
     Returns:
-        State with 'functions' key containing list of function info
+        State update with 'functions' key containing parallel 'names', 'lines'
+        and 'start_pos' lists (one entry per function)
     """
     code = state.get("code", "")
+    functions = _analyze(code).functions
+    
+    names = [function[0] for function in functions]
+    line_nums = [function[1] for function in functions]
+    start_positions = [function[2] for function in functions]
+    
+    return {
+        "functions": {
+            "names": names,
+            "lines": line_nums,
+            "start_pos": start_positions
+        },
+        "function_count": len(names)
+    }
+
+
+def _function_names(state: Dict[str, Any]) -> List[str]:
+    """
+    Read the extracted function names from state.
     
-    # Simple regex to find function definitions
-    # Format: def function_name(params):
-    pattern = r'def\s+(\w+)\s*\([^)]*\):'
-    matches = re.finditer(pattern, code)
+    Accepts the {"names", "lines", "start_pos"} lists written by
+    extract_functions as well as the older list of {"name", ...} dicts, so
+    states built for the old layout keep working.
     
-    functions = []
-    for match in matches:
-        func_name = match.group(1)
-        start_pos = match.start()
-        
-        # Count lines to get line number
-        line_num = code[:start_pos].count('\n') + 1
+    Args:
+        state: Workflow state, possibly containing 'functions'
         
-        functions.append({
-            "name": func_name,
-            "line": line_num,
-            "start_pos": start_pos
-        })
-    
-    state["functions"] = functions
-    state["function_count"] = len(functions)
-    
-    return state
+    Returns:
+        Function names in definition order
+    """
+    functions = state.get("functions", {})
+    if isinstance(functions, dict):
+        return functions.get("names", [])
+    return [function["name"] for function in functions]
 
 
-@tool(name="check_complexity", description="Calculate code complexity metrics")
+@tool(name="check_complexity", description="Calculate code complexity metrics", returns_delta=True)
 def check_complexity(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate simple complexity metrics for the code.
@@ -62,20 +196,20 @@ def check_complexity(state: Dict[str, Any]) -> Dict[str, Any]:
         state: Must contain 'code' key
         
     Returns:
-        State with 'complexity_scores' key
+        State update with 'complexity_scores' key
     """
-    code = state.get("code", "")
-    functions = state.get("functions", [])
+    analysis = _analyze(state.get("code", ""))
+    function_names = _function_names(state)
     
-    # Count various complexity indicators
-    lines = [line for line in code.split('\n') if line.strip() and not line.strip().startswith('#')]
-    loc = len(lines)
+    # Count various complexity indicators (non-blank, non-comment lines)
+    loc = analysis.code_lines
     
     # Count control structures
-    if_count = len(re.findall(r'\bif\b', code))
-    else_count = len(re.findall(r'\belse\b', code))
-    for_count = len(re.findall(r'\bfor\b', code))
-    while_count = len(re.findall(r'\bwhile\b', code))
+    counts = analysis.counts
+    if_count = counts["if"]
+    else_count = counts["else"]
+    for_count = counts["for"]
+    while_count = counts["while"]
     
     # Calculate complexity score (simple heuristic)
     # Base complexity from LOC
@@ -85,47 +219,36 @@ def check_complexity(state: Dict[str, Any]) -> Dict[str, Any]:
     complexity += (if_count + else_count) * 2
     complexity += (for_count + while_count) * 3
     
-    # Per-function complexity (simplified)
-    function_complexity = {}
-    for func in functions:
-        # Simplified: assume each function adds base complexity
-        function_complexity[func["name"]] = 5 + (loc / max(len(functions), 1)) * 0.5
-    
-    state["complexity_scores"] = {
-        "total_complexity": round(complexity, 2),
-        "lines_of_code": loc,
-        "control_structures": if_count + else_count + for_count + while_count,
-        "function_complexity": function_complexity
+    # Per-function complexity (simplified): every function gets the same
+    # base complexity plus its share of the LOC
+    per_function = 5 + (loc / max(len(function_names), 1)) * 0.5
+    function_complexity = dict.fromkeys(function_names, per_function)
+    
+    return {
+        "complexity_scores": {
+            "total_complexity": round(complexity, 2),
+            "lines_of_code": loc,
+            "control_structures": if_count + else_count + for_count + while_count,
+            "function_complexity": function_complexity
+        }
     }
-    
-    return state
 
 
-@tool(name="detect_issues", description="Detect common code issues and smells")
-def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
+def _find_issues(analysis: _CodeAnalysis, function_count: int) -> List[Dict[str, str]]:
     """
-    Detect common code issues and smells.
-    
-    Checks for:
-    - Long functions (> 50 lines)
-    - Missing docstrings
-    - Too many parameters
-    - Global variables
-    - Bare except clauses
+    Run the detect_issues checks on an analysis.
     
     Args:
-        state: Must contain 'code' key
+        analysis: Cached analysis of the code
+        function_count: Number of functions found in the code
         
     Returns:
-        State with 'issues' key containing list of issues
+        List of issue dictionaries
     """
-    code = state.get("code", "")
-    functions = state.get("functions", [])
-    
     issues = []
     
     # Check for bare except clauses
-    if re.search(r'except\s*:', code):
+    if analysis.has_bare_except:
         issues.append({
             "type": "bare_except",
             "severity": "medium",
@@ -133,34 +256,34 @@ def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
         })
     
     # Check for global variables (simplified)
-    global_vars = re.findall(r'^[A-Z_][A-Z0-9_]*\s*=', code, re.MULTILINE)
-    if len(global_vars) > 3:
+    global_count = analysis.global_count
+    if global_count > 3:
         issues.append({
             "type": "too_many_globals",
             "severity": "low",
-            "message": f"Found {len(global_vars)} global variables - consider reducing"
+            "message": f"Found {global_count} global variables - consider reducing"
         })
     
     # Check for missing docstrings
-    functions_with_docstrings = len(re.findall(r'def\s+\w+\s*\([^)]*\):\s*"""', code))
-    if len(functions) > 0 and functions_with_docstrings < len(functions):
+    functions_with_docstrings = analysis.documented_count
+    if function_count > 0 and functions_with_docstrings < function_count:
         issues.append({
             "type": "missing_docstrings",
             "severity": "low",
-            "message": f"{len(functions) - functions_with_docstrings} functions missing docstrings"
+            "message": f"{function_count - functions_with_docstrings} functions missing docstrings"
         })
     
     # Check for long lines
-    long_lines = [i+1 for i, line in enumerate(code.split('\n')) if len(line) > 100]
-    if long_lines:
+    long_line_count = analysis.long_line_count
+    if long_line_count:
         issues.append({
             "type": "long_lines",
             "severity": "low",
-            "message": f"{len(long_lines)} lines exceed 100 characters"
+            "message": f"{long_line_count} lines exceed 100 characters"
         })
     
-    # Check code length
-    loc = len([line for line in code.split('\n') if line.strip()])
+    # Check code length (non-blank lines)
+    loc = analysis.non_blank_lines
     if loc > 200:
         issues.append({
             "type": "long_file",
@@ -168,13 +291,39 @@ def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
             "message": f"File has {loc} lines - consider splitting into smaller modules"
         })
     
-    state["issues"] = issues
-    state["issue_count"] = len(issues)
+    return issues
+
+
+@tool(name="detect_issues", description="Detect common code issues and smells", returns_delta=True)
+def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Detect common code issues and smells.
+    
+    Checks for:
+    - Long functions (> 50 lines)
+    - Missing docstrings
+    - Too many parameters
+    - Global variables
+    - Bare except clauses
     
-    return state
+    Args:
+        state: Must contain 'code' key
+        
+    Returns:
+        State update with 'issues' key containing list of issues
+    """
+    code = state.get("code", "")
+    function_count = len(_function_names(state))
+    
+    issues = _find_issues(_analyze(code), function_count)
+    
+    return {
+        "issues": issues,
+        "issue_count": len(issues)
+    }
 
 
-@tool(name="suggest_improvements", description="Generate improvement suggestions based on detected issues")
+@tool(name="suggest_improvements", description="Generate improvement suggestions based on detected issues", returns_delta=True)
 def suggest_improvements(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate improvement suggestions based on detected issues.
@@ -183,30 +332,18 @@ def suggest_improvements(state: Dict[str, Any]) -> Dict[str, Any]:
         state: Must contain 'issues' and 'complexity_scores'
         
     Returns:
-        State with 'suggestions' key
+        State update with 'suggestions' key
     """
     issues = state.get("issues", [])
     complexity = state.get("complexity_scores", {})
     
-    suggestions = []
-    
-    # Suggestions based on issues
-    issue_types = {issue["type"] for issue in issues}
-    
-    if "bare_except" in issue_types:
-        suggestions.append("Replace bare 'except:' with specific exception types (e.g., 'except ValueError:')")
-    
-    if "missing_docstrings" in issue_types:
-        suggestions.append("Add docstrings to all functions describing their purpose, parameters, and return values")
-    
-    if "long_lines" in issue_types:
-        suggestions.append("Break long lines into multiple lines for better readability (PEP 8 recommends max 79 characters)")
-    
-    if "long_file" in issue_types:
-        suggestions.append("Consider splitting this file into smaller, focused modules")
-    
-    if "too_many_globals" in issue_types:
-        suggestions.append("Reduce global variables by encapsulating them in classes or functions")
+    # Suggestions based on issues, emitted in _SUGGESTIONS order
+    seen = set()
+    for issue in issues:
+        issue_type = issue["type"]
+        if issue_type in _SUGGESTIONS:
+            seen.add(issue_type)
+    suggestions = [text for issue_type, text in _SUGGESTIONS.items() if issue_type in seen]
     
     # Suggestions based on complexity
     total_complexity = complexity.get("total_complexity", 0)
@@ -221,12 +358,10 @@ def suggest_improvements(state: Dict[str, Any]) -> Dict[str, Any]:
     if not suggestions:
         suggestions.append("Code looks good! Consider adding type hints for better code documentation")
     
-    state["suggestions"] = suggestions
-    
-    return state
+    return {"suggestions": suggestions}
 
 
-@tool(name="calculate_quality_score", description="Calculate overall code quality score")
+@tool(name="calculate_quality_score", description="Calculate overall code quality score", returns_delta=True)
 def calculate_quality_score(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate overall code quality score (0-100).
@@ -240,7 +375,7 @@ def calculate_quality_score(state: Dict[str, Any]) -> Dict[str, Any]:
         state: Must contain 'issues' and 'complexity_scores'
         
     Returns:
-        State with 'quality_score' key
+        State update with 'quality_score' key
     """
     issues = state.get("issues", [])
     complexity = state.get("complexity_scores", {})
@@ -248,15 +383,8 @@ def calculate_quality_score(state: Dict[str, Any]) -> Dict[str, Any]:
     # Start with perfect score
     score = 100.0
     
-    # Deduct points for issues
-    for issue in issues:
-        severity = issue.get("severity", "low")
-        if severity == "high":
-            score -= 15
-        elif severity == "medium":
-            score -= 10
-        else:  # low
-            score -= 5
+    # Deduct points for issues (unknown severities count as low)
+    score -= sum(_SEVERITY_PENALTY.get(issue.get("severity", "low"), 5) for issue in issues)
     
     # Deduct points for high complexity
     total_complexity = complexity.get("total_complexity", 0)
@@ -279,10 +407,8 @@ def calculate_quality_score(state: Dict[str, Any]) -> Dict[str, Any]:
     # Ensure score is between 0 and 100
     score = max(0, min(100, score))
     
-    state["quality_score"] = round(score, 2)
-    
-    # Increment iteration counter
-    iterations = state.get("iterations", 0)
-    state["iterations"] = iterations + 1
-    
-    return state
+    return {
+        "quality_score": round(score, 2),
+        # Increment iteration counter
+        "iterations": state.get("iterations", 0) + 1
+    }
@@ -8,110 +8,140 @@ from typing import Callable, Dict, Any, Optional
 from functools import wraps
 
 
-class ToolRegistry:
+# Registered tools: name -> {"function", "description", "name", "returns_delta"}
+_TOOLS: Dict[str, Dict[str, Any]] = {}
+
+# Registered tool functions by name, for single-lookup dispatch
+_FUNCTIONS: Dict[str, Callable] = {}
+
+
+def register(
+    name: str,
+    function: Callable,
+    description: Optional[str] = None,
+    returns_delta: bool = False
+) -> None:
     """
-    Singleton registry for workflow tools.
+    Register a tool.
     
-    Tools are functions that can be registered and called by name.
+    Args:
+        name: Unique name for the tool
+        function: Function to register
+        description: Optional description of what the tool does
+        returns_delta: Whether the function returns only the keys it sets,
+            to be merged into the state, instead of the whole state
     """
+    if name in _TOOLS:
+        raise ValueError(f"Tool '{name}' is already registered")
     
-    _instance = None
-    _tools: Dict[str, Dict[str, Any]] = {}
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ToolRegistry, cls).__new__(cls)
-        return cls._instance
+    _TOOLS[name] = {
+        "function": function,
+        "description": description or function.__doc__ or f"Tool: {name}",
+        "name": name,
+        "returns_delta": returns_delta
+    }
+    _FUNCTIONS[name] = function
+
+
+def get(name: str) -> Callable:
+    """
+    Get a tool by name.
     
-    @classmethod
-    def register(
-        cls,
-        name: str,
-        function: Callable,
-        description: Optional[str] = None
-    ) -> None:
-        """
-        Register a tool.
+    Args:
+        name: Name of the tool
         
-        Args:
-            name: Unique name for the tool
-            function: Function to register
-            description: Optional description of what the tool does
-        """
-        if name in cls._tools:
-            raise ValueError(f"Tool '{name}' is already registered")
+    Returns:
+        Tool function
         
-        cls._tools[name] = {
-            "function": function,
-            "description": description or function.__doc__ or f"Tool: {name}",
-            "name": name
-        }
+    Raises:
+        KeyError: If tool not found
+    """
+    try:
+        return _FUNCTIONS[name]
+    except KeyError:
+        raise KeyError(f"Tool '{name}' not found in registry") from None
+
+
+def get_info(name: str) -> Dict[str, Any]:
+    """
+    Get tool information.
     
-    @classmethod
-    def get(cls, name: str) -> Callable:
-        """
-        Get a tool by name.
+    Args:
+        name: Name of the tool
         
-        Args:
-            name: Name of the tool
-            
-        Returns:
-            Tool function
-            
-        Raises:
-            KeyError: If tool not found
-        """
-        if name not in cls._tools:
-            raise KeyError(f"Tool '{name}' not found in registry")
-        return cls._tools[name]["function"]
+    Returns:
+        Tool metadata
+    """
+    try:
+        return _TOOLS[name]
+    except KeyError:
+        raise KeyError(f"Tool '{name}' not found in registry") from None
+
+
+def list_tools() -> Dict[str, str]:
+    """
+    List all registered tools.
     
-    @classmethod
-    def get_info(cls, name: str) -> Dict[str, Any]:
-        """
-        Get tool information.
-        
-        Args:
-            name: Name of the tool
-            
-        Returns:
-            Tool metadata
-        """
-        if name not in cls._tools:
-            raise KeyError(f"Tool '{name}' not found in registry")
-        return cls._tools[name]
+    Returns:
+        Dictionary of tool names to descriptions
+    """
+    return {name: info["description"] for name, info in _TOOLS.items()}
+
+
+def execute(name: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Execute a tool by name.
     
-    @classmethod
-    def list_tools(cls) -> Dict[str, str]:
-        """
-        List all registered tools.
-        
-        Returns:
-            Dictionary of tool names to descriptions
-        """
-        return {name: info["description"] for name, info in cls._tools.items()}
+    Tools registered with returns_delta only return the keys they set;
+    those are merged into state, so callers always get the full state.
     
-    @classmethod
-    def execute(cls, name: str, state: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Execute a tool by name.
+    Args:
+        name: Name of the tool
+        state: Current state dictionary
         
-        Args:
-            name: Name of the tool
-            state: Current state dictionary
-            
-        Returns:
-            Modified state dictionary
-        """
-        tool = cls.get(name)
-        return tool(state)
+    Returns:
+        Modified state dictionary
+    """
+    info = get_info(name)
+    result = info["function"](state)
+    if info["returns_delta"]:
+        state.update(result)
+        return state
+    return result
+
+
+def clear() -> None:
+    """Clear all registered tools (useful for testing)."""
+    _TOOLS.clear()
+    _FUNCTIONS.clear()
+
+
+# Unchecked name -> function lookup for hot callers to bind once
+get_fn = _FUNCTIONS.__getitem__
+
+
+class ToolRegistry:
+    """
+    Registry for workflow tools.
+    
+    Tools are functions that can be registered and called by name. The
+    registry itself is the module-level tool table; this class keeps the
+    original ToolRegistry.<method>() interface on top of it.
+    """
     
-    @classmethod
-    def clear(cls) -> None:
-        """Clear all registered tools (useful for testing)."""
-        cls._tools = {}
+    register = staticmethod(register)
+    get = staticmethod(get)
+    get_info = staticmethod(get_info)
+    list_tools = staticmethod(list_tools)
+    execute = staticmethod(execute)
+    clear = staticmethod(clear)
 
 
-def tool(name: Optional[str] = None, description: Optional[str] = None):
+def tool(
+    name: Optional[str] = None,
+    description: Optional[str] = None,
+    returns_delta: bool = False
+):
     """
     Decorator for registering tools.
     
@@ -120,14 +150,21 @@ def tool(name: Optional[str] = None, description: Optional[str] = None):
         def my_tool_function(state: Dict[str, Any]) -> Dict[str, Any]:
             # ... modify state ...
             return state
+        
+        @tool(name="my_delta_tool", returns_delta=True)
+        def my_delta_tool(state: Dict[str, Any]) -> Dict[str, Any]:
+            # ... read state ...
+            return {"result": ...}
     
     Args:
         name: Optional name for the tool (defaults to function name)
         description: Optional description
+        returns_delta: Whether the tool returns only the keys it sets
     """
     def decorator(func: Callable) -> Callable:
         tool_name = name or func.__name__
-        ToolRegistry.register(tool_name, func, description)
+        func.returns_delta = returns_delta
+        register(tool_name, func, description, returns_delta)
         
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -10,6 +10,42 @@ This workflow demonstrates all required features:
 
 from typing import Dict, Any
 
+# Sample code reviewed by the example workflow runs
+SAMPLE_CODE = '''
+def calculate_sum(a, b):
+    return a + b
+
+def process_data(data):
+    result = []
+    for item in data:
+        if item > 0:
+            if item % 2 == 0:
+                result.append(item * 2)
+            else:
+                result.append(item * 3)
+        else:
+            result.append(0)
+    return result
+
+def complex_function(x, y, z, a, b, c, d, e, f):
+    try:
+        value = 0
+        for i in range(x):
+            for j in range(y):
+                if i > j:
+                    value += i * j
+                else:
+                    value -= i * j
+        return value
+    except:
+        return None
+
+GLOBAL_CONFIG = {"setting1": "value1", "setting2": "value2"}
+GLOBAL_STATE = {}
+GLOBAL_CACHE = {}
+GLOBAL_DATA = []
+'''
+
 
 def create_code_review_workflow() -> Dict[str, Any]:
     """
@@ -93,40 +129,7 @@ def get_sample_code() -> str:
     Returns:
         Sample Python code string
     """
-    return '''
-def calculate_sum(a, b):
-    return a + b
-
-def process_data(data):
-    result = []
-    for item in data:
-        if item > 0:
-            if item % 2 == 0:
-                result.append(item * 2)
-            else:
-                result.append(item * 3)
-        else:
-            result.append(0)
-    return result
-
-def complex_function(x, y, z, a, b, c, d, e, f):
-    try:
-        value = 0
-        for i in range(x):
-            for j in range(y):
-                if i > j:
-                    value += i * j
-                else:
-                    value -= i * j
-        return value
-    except:
-        return None
-
-GLOBAL_CONFIG = {"setting1": "value1", "setting2": "value2"}
-GLOBAL_STATE = {}
-GLOBAL_CACHE = {}
-GLOBAL_DATA = []
-'''
+    return SAMPLE_CODE
 
 
 def get_initial_state() -> Dict[str, Any]:
@@ -10,5 +10,12 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # Protocol-level WebSocket keepalive, so idle log subscribers
+        # need no application-level heartbeat
+        ws_ping_interval=20,
+        ws_ping_timeout=20,
+        # Log frames are small JSON; deflating each one costs more CPU
+        # than it saves in bandwidth
+        ws_per_message_deflate=False
     )
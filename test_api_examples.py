@@ -6,77 +6,57 @@ Then use these examples to test the API.
 """
 
 import requests
-import json
+import orjson
+import time
+
+from app.workflows.code_review import (
+    create_code_review_workflow,
+    get_initial_state,
+    get_sample_code
+)
 
 BASE_URL = "http://localhost:8000"
 
+# One pooled session so every request reuses the same keep-alive connection
+SESSION = requests.Session()
+
+# Longer dumps are cut off when printed
+MAX_DUMP_CHARS = 10_000
+
+
+def _dump(obj):
+    """Pretty-print JSON with orjson, eliding very large payloads."""
+    text = orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    if len(text) > MAX_DUMP_CHARS:
+        text = text[:MAX_DUMP_CHARS] + f"... ({len(text)} chars)"
+    return text
+
 
 def test_health_check():
     """Test the health check endpoint."""
     print("=== Testing Health Check ===")
-    response = requests.get(f"{BASE_URL}/health")
+    response = SESSION.get(f"{BASE_URL}/health")
     print(f"Status: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}\n")
+    print(f"Response: {_dump(response.json())}\n")
 
 
 def test_list_tools():
     """List available tools."""
     print("=== Listing Available Tools ===")
-    response = requests.get(f"{BASE_URL}/tools")
+    response = SESSION.get(f"{BASE_URL}/tools")
     print(f"Status: {response.status_code}")
-    print(f"Tools: {json.dumps(response.json(), indent=2)}\n")
+    print(f"Tools: {_dump(response.json())}\n")
 
 
 def create_code_review_graph():
     """Create the code review workflow graph."""
     print("=== Creating Code Review Graph ===")
     
-    graph_data = {
-        "name": "code_review_workflow",
-        "description": "A workflow for reviewing code quality with iterative improvements",
-        "nodes": [
-            {
-                "name": "extract_functions",
-                "function": "extract_functions",
-                "description": "Extract function definitions from Python code"
-            },
-            {
-                "name": "check_complexity",
-                "function": "check_complexity",
-                "description": "Calculate code complexity metrics"
-            },
-            {
-                "name": "detect_issues",
-                "function": "detect_issues",
-                "description": "Detect common code issues and smells"
-            },
-            {
-                "name": "suggest_improvements",
-                "function": "suggest_improvements",
-                "description": "Generate improvement suggestions"
-            },
-            {
-                "name": "calculate_score",
-                "function": "calculate_quality_score",
-                "description": "Calculate overall quality score"
-            }
-        ],
-        "edges": [
-            {"from_node": "extract_functions", "to_node": "check_complexity"},
-            {"from_node": "check_complexity", "to_node": "detect_issues"},
-            {"from_node": "detect_issues", "to_node": "suggest_improvements"},
-            {"from_node": "suggest_improvements", "to_node": "calculate_score"},
-            {
-                "from_node": "calculate_score",
-                "to_node": "detect_issues",
-                "condition": "quality_score < threshold and iterations < max_iterations"
-            }
-        ]
-    }
+    graph_data = create_code_review_workflow()
     
-    response = requests.post(f"{BASE_URL}/graph/create", json=graph_data)
+    response = SESSION.post(f"{BASE_URL}/graph/create", json=graph_data)
     print(f"Status: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}\n")
+    print(f"Response: {_dump(response.json())}\n")
     
     if response.status_code == 201:
         return response.json()["graph_id"]
@@ -87,52 +67,17 @@ def run_workflow(graph_id):
     """Run the code review workflow."""
     print(f"=== Running Workflow (Graph ID: {graph_id}) ===")
     
-    sample_code = '''
-def calculate_sum(a, b):
-    return a + b
-
-def process_data(data):
-    result = []
-    for item in data:
-        if item > 0:
-            if item % 2 == 0:
-                result.append(item * 2)
-            else:
-                result.append(item * 3)
-        else:
-            result.append(0)
-    return result
-
-def complex_function(x, y, z, a, b, c, d, e, f):
-    try:
-        value = 0
-        for i in range(x):
-            for j in range(y):
-                if i > j:
-                    value += i * j
-                else:
-                    value -= i * j
-        return value
-    except:
-        return None
-
-GLOBAL_CONFIG = {"setting1": "value1"}
-GLOBAL_STATE = {}
-GLOBAL_CACHE = {}
-GLOBAL_DATA = []
-'''
-    
     run_data = {
         "graph_id": graph_id,
         "initial_state": {
-            "code": sample_code,
+            "code": get_sample_code(),
             "threshold": 70.0,
             "max_iterations": 3,
             "iterations": 0
         }
     }
     
-    response = requests.post(f"{BASE_URL}/graph/run", json=run_data)
+    response = SESSION.post(f"{BASE_URL}/graph/run", json=run_data)
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -158,11 +103,54 @@ GLOBAL_DATA = []
         return None
 
 
+def run_workflow_async(graph_id, initial_state, timeout=30.0):
+    """Run a workflow in the background and poll until it finishes."""
+    print(f"\n=== Running Workflow in Background (Graph ID: {graph_id}) ===")
+    
+    response = SESSION.post(
+        f"{BASE_URL}/graph/run/async",
+        json={"graph_id": graph_id, "initial_state": initial_state}
+    )
+    print(f"Status: {response.status_code}")
+    if response.status_code != 200:
+        print(f"Error: {response.text}")
+        return None
+    
+    run_id = response.json()["run_id"]
+    
+    # Poll with exponential backoff (fast runs are seen after ~50ms, slow
+    # ones are polled at most once a second); the ETag turns polls without
+    # progress into empty 304 responses
+    delay = 0.05
+    etag = None
+    result = None
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        headers = {"If-None-Match": etag} if etag else {}
+        response = SESSION.get(f"{BASE_URL}/graph/state/{run_id}", headers=headers)
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            result = response.json()
+            if result["status"] in ("completed", "failed"):
+                break
+        elif response.status_code != 304:
+            print(f"Error: {response.text}")
+            return None
+        time.sleep(delay)
+        delay = min(1.0, delay * 1.6)
+    
+    if result:
+        print(f"Run ID: {run_id}")
+        print(f"Status: {result['status']}")
+        print(f"Steps Executed: {len(result['execution_logs'])}")
+    return run_id
+
+
 def get_run_state(run_id):
     """Get the state of a workflow run."""
     print(f"\n=== Getting Run State (Run ID: {run_id}) ===")
     
-    response = requests.get(f"{BASE_URL}/graph/state/{run_id}")
+    response = SESSION.get(f"{BASE_URL}/graph/state/{run_id}")
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -193,6 +181,9 @@ if __name__ == "__main__":
         if run_id:
             # Get run state
             get_run_state(run_id)
+        
+        # Run in the background and poll for the result
+        run_workflow_async(graph_id, get_initial_state())
     
     print("\n" + "=" * 60)
     print("Test suite completed!")
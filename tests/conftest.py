@@ -0,0 +1,12 @@
+"""
+Shared test configuration.
+
+Points the application at a throwaway SQLite database before any app
+module (and with it the engine) is imported.
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="stateflow-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
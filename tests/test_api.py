@@ -0,0 +1,175 @@
+"""
+Tests for the workflow API routes.
+"""
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.database import SessionLocal
+from app.main import app
+from app.models import ExecutionLog, WorkflowRun
+from app.tools import registry
+from app.workflows.code_review import create_code_review_workflow, get_initial_state
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def graph_id(client):
+    response = client.post("/graph/create", json=create_code_review_workflow())
+    assert response.status_code == 201
+    return response.json()["graph_id"]
+
+
+@pytest.mark.parametrize("condition, detail", [
+    ("len(issues) > 0", "Unsupported expression in condition 'len(issues) > 0': Call"),
+    ("score <", "Invalid syntax in condition 'score <'"),
+])
+def test_create_graph_rejects_invalid_conditions(client, condition, detail):
+    response = client.post("/graph/create", json={
+        "name": "bad condition",
+        "nodes": [
+            {"name": "a", "function": "extract_functions"},
+            {"name": "b", "function": "check_complexity"}
+        ],
+        "edges": [{"from_node": "a", "to_node": "b", "condition": condition}]
+    })
+    
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+
+
+def run_request(graph_id, run_id=None):
+    request = {"graph_id": graph_id, "initial_state": get_initial_state()}
+    if run_id is not None:
+        request["run_id"] = run_id
+    return request
+
+
+@pytest.mark.parametrize("path", ["/graph/run", "/graph/run/async"])
+def test_client_chosen_run_id_is_used(client, graph_id, path):
+    run_id = str(uuid.uuid4())
+    
+    response = client.post(path, json=run_request(graph_id, run_id))
+    
+    assert response.status_code == 200
+    assert response.json()["run_id"] == run_id
+
+
+@pytest.mark.parametrize("path", ["/graph/run", "/graph/run/async"])
+def test_duplicate_run_id_is_rejected(client, graph_id, path):
+    run_id = str(uuid.uuid4())
+    assert client.post("/graph/run", json=run_request(graph_id, run_id)).status_code == 200
+    
+    response = client.post(path, json=run_request(graph_id, run_id))
+    
+    assert response.status_code == 409
+
+
+@pytest.mark.parametrize("path", ["/graph/run", "/graph/run/async"])
+def test_duplicate_run_id_racing_the_check_is_rejected(client, graph_id, path, monkeypatch):
+    run_id = str(uuid.uuid4())
+    assert client.post("/graph/run", json=run_request(graph_id, run_id)).status_code == 200
+    # Simulate a concurrent request that passed the existence check first
+    monkeypatch.setattr(routes, "reserve_run_id", lambda request, db: request.run_id)
+    
+    response = client.post(path, json=run_request(graph_id, run_id))
+    
+    assert response.status_code == 409
+    state = client.get(f"/graph/state/{run_id}").json()
+    assert state["status"] == "completed"
+
+
+def test_run_stores_every_step_in_order(client, graph_id):
+    response = client.post("/graph/run", json=run_request(graph_id))
+    assert response.status_code == 200
+    run = response.json()
+    
+    state = client.get(f"/graph/state/{run['run_id']}").json()
+    
+    logs = state["execution_logs"]
+    assert [log["node_name"] for log in logs] == [log["node_name"] for log in run["execution_logs"]]
+    assert [log["step_number"] for log in logs] == list(range(1, len(logs) + 1))
+    assert logs[-1]["state_after"] == run["final_state"]
+
+
+def test_sync_run_is_visible_while_running(client):
+    seen = {}
+    
+    def probe(state):
+        # A separate session only sees what run_graph has committed
+        with SessionLocal() as db:
+            runs = db.query(WorkflowRun).filter(WorkflowRun.graph_id == seen["graph_id"]).all()
+            seen["statuses"] = [run.status.value for run in runs]
+        return state
+    
+    registry.register("probe_run_state", probe)
+    try:
+        graph = client.post("/graph/create", json={
+            "name": "probe",
+            "nodes": [{"name": "probe", "function": "probe_run_state"}],
+            "edges": []
+        }).json()
+        seen["graph_id"] = graph["graph_id"]
+        response = client.post("/graph/run", json={"graph_id": graph["graph_id"], "initial_state": {}})
+    finally:
+        registry._TOOLS.pop("probe_run_state")
+        registry._FUNCTIONS.pop("probe_run_state")
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert seen["statuses"] == ["running"]
+
+
+@pytest.fixture(scope="module")
+def completed_run(client, graph_id):
+    response = client.post("/graph/run", json=run_request(graph_id))
+    assert response.status_code == 200
+    run_id = response.json()["run_id"]
+    return run_id, client.get(f"/graph/state/{run_id}").headers["etag"]
+
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    "W/{etag}",
+    '"other", {etag}',
+    '"other",W/{etag}',
+    "*",
+])
+def test_state_is_not_modified_for_matching_etags(client, completed_run, header):
+    run_id, etag = completed_run
+    
+    response = client.get(f"/graph/state/{run_id}", headers={"If-None-Match": header.format(etag=etag)})
+    
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_state_is_sent_for_stale_etags(client, completed_run):
+    run_id, _ = completed_run
+    
+    response = client.get(f"/graph/state/{run_id}", headers={"If-None-Match": '"stale", W/"older"'})
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+def test_etag_changes_when_steps_are_logged(client, graph_id):
+    run_id = client.post("/graph/run", json=run_request(graph_id)).json()["run_id"]
+    etag = client.get(f"/graph/state/{run_id}").headers["etag"]
+    with SessionLocal() as db:
+        db.add(ExecutionLog(run_id=run_id, node_name="extra", step_number=99, state_patch="[]"))
+        db.commit()
+    
+    response = client.get(f"/graph/state/{run_id}", headers={"If-None-Match": etag})
+    
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
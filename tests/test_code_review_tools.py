@@ -0,0 +1,136 @@
+"""
+Tests for the code review tools and their shared AST analysis.
+"""
+
+import ast
+import re
+from dataclasses import fields
+
+import pytest
+
+from app.tools.code_review_tools import (
+    _analyze,
+    check_complexity,
+    detect_issues,
+    extract_functions,
+)
+
+SAMPLE_CODE = '''
+MAX_SIZE = 10
+MIN_SIZE = 1
+
+
+def load(path):
+    """Load a file."""
+    for line in open(path):
+        if line:
+            yield line
+        else:
+            break
+
+
+def save(path, data):
+    while data:
+        try:
+            data.pop()
+        except:
+            pass
+'''
+
+
+def regex_functions(code):
+    """The original regex scan of extract_functions, as (name, line, start_pos)."""
+    return [
+        (match.group(1), code[:match.start()].count('\n') + 1, match.start())
+        for match in re.finditer(r'def\s+(\w+)\s*\([^)]*\):', code)
+    ]
+
+
+def regex_counts(code):
+    """The original regex keyword counts of check_complexity."""
+    return {keyword: len(re.findall(rf'\b{keyword}\b', code)) for keyword in ("if", "else", "for", "while")}
+
+
+def test_functions_are_parallel_lists():
+    result = extract_functions({"code": SAMPLE_CODE})
+    
+    assert result == {
+        "functions": {"names": ["load", "save"], "lines": [6, 15], "start_pos": [30, 171]},
+        "function_count": 2,
+    }
+    names, lines, start_pos = result["functions"].values()
+    assert list(zip(names, lines, start_pos)) == regex_functions(SAMPLE_CODE)
+
+
+@pytest.mark.parametrize("functions", [
+    {"names": ["load", "save"], "lines": [6, 15], "start_pos": [30, 171]},
+    # Layout written before the parallel lists
+    [{"name": "load", "line": 6, "start_pos": 30}, {"name": "save", "line": 15, "start_pos": 171}],
+])
+def test_readers_accept_both_function_layouts(functions):
+    complexity = check_complexity({"code": SAMPLE_CODE, "functions": functions})["complexity_scores"]
+    issues = detect_issues({"code": SAMPLE_CODE, "functions": functions})["issues"]
+    
+    assert list(complexity["function_complexity"]) == ["load", "save"]
+    assert "missing_docstrings" in [issue["type"] for issue in issues]
+
+
+def test_analysis_matches_regex_scan_on_plain_code():
+    analysis = _analyze(SAMPLE_CODE)
+    
+    assert list(analysis.functions) == regex_functions(SAMPLE_CODE)
+    assert analysis.counts == regex_counts(SAMPLE_CODE)
+    assert analysis.has_bare_except
+    assert analysis.global_count == 2
+    assert analysis.documented_count == 1
+
+
+def test_analysis_ignores_keywords_in_strings_and_comments():
+    code = (
+        'def run(\n'
+        '    items,\n'
+        '):\n'
+        '    # if this were real code, for example\n'
+        '    text = "def fake(): while else"\n'
+        '    return [item for item in items if item]\n'
+    )
+    analysis = _analyze(code)
+    
+    # The regex scan also matches the "def" inside the string literal
+    assert [name for name, _, _ in regex_functions(code)] == ["run", "fake"]
+    assert [name for name, _, _ in analysis.functions] == ["run"]
+    assert analysis.counts == {"if": 1, "else": 0, "for": 1, "while": 0}
+
+
+def test_elif_counts_as_if_only():
+    code = "if a:\n    pass\nelif b:\n    pass\nelse:\n    if c:\n        pass\n"
+    
+    assert _analyze(code).counts == {"if": 3, "else": 1, "for": 0, "while": 0}
+
+
+def test_start_pos_counts_characters():
+    code = 'NAME = "é"\nclass A:\n    def m(self):\n        pass\n'
+    
+    assert extract_functions({"code": code})["functions"]["start_pos"] == [code.index("def m")]
+
+
+def test_unparsable_code_falls_back_to_regex_scan():
+    code = SAMPLE_CODE + "\ndef broken(:\n"
+    analysis = _analyze(code)
+    
+    assert list(analysis.functions) == regex_functions(code)
+    assert analysis.counts == regex_counts(code)
+    assert analysis.has_bare_except
+
+
+def test_tools_share_one_cached_analysis():
+    first = _analyze(SAMPLE_CODE)
+    state = {"code": SAMPLE_CODE}
+    state.update(extract_functions(state))
+    state.update(check_complexity(state))
+    state.update(detect_issues(state))
+    
+    assert _analyze(SAMPLE_CODE) is first
+    assert not any(isinstance(getattr(first, field.name), ast.AST) for field in fields(first))
+    assert state["complexity_scores"]["lines_of_code"] == 15
+    assert [issue["type"] for issue in state["issues"]] == ["bare_except", "missing_docstrings"]
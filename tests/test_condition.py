@@ -0,0 +1,55 @@
+"""
+Tests for edge condition compilation.
+"""
+
+import pytest
+
+from app.engine import WorkflowState, compile_condition
+
+
+@pytest.mark.parametrize("source, data, expected", [
+    ("quality_score < threshold and iterations < max_iterations",
+     {"quality_score": 50, "threshold": 70, "iterations": 1, "max_iterations": 3}, True),
+    ("quality_score < threshold and iterations < max_iterations",
+     {"quality_score": 90, "threshold": 70, "iterations": 1, "max_iterations": 3}, False),
+    ("not done or count >= 2 * limit", {"done": True, "count": 4, "limit": 2}, True),
+    ("status in ['ok', 'done']", {"status": "ok"}, True),
+    ("scores[0] > 1 if scores else False", {"scores": [2]}, True),
+    ("config['mode'] == 'fast'", {"config": {"mode": "fast"}}, True),
+    ("value is None", {"value": None}, True),
+    ("-x + 1 == 0", {"x": 1}, True),
+])
+def test_allowed_expressions(source, data, expected):
+    assert compile_condition(source)(WorkflowState.from_dict(data)) == expected
+
+
+@pytest.mark.parametrize("source", [
+    "len(items) > 0",
+    "state.data",
+    "__import__('os').system('true')",
+    "(lambda: 1)()",
+    "[x for x in items]",
+    "items.pop()",
+    "x := 1",
+])
+def test_rejected_expressions(source):
+    with pytest.raises((ValueError, SyntaxError)):
+        compile_condition(source)
+
+
+def test_missing_state_variable_is_a_name_error():
+    condition = compile_condition("missing_key > 1")
+    
+    with pytest.raises(NameError, match="'missing_key' is not defined in state"):
+        condition(WorkflowState.from_dict({}))
+
+
+def test_missing_subscript_key_is_a_key_error():
+    condition = compile_condition("config['mode'] == 'fast'")
+    
+    with pytest.raises(KeyError, match="mode"):
+        condition(WorkflowState.from_dict({"config": {}}))
+
+
+def test_conditions_are_shared_by_source():
+    assert compile_condition("a < b") is compile_condition("a < b")
@@ -0,0 +1,143 @@
+"""
+Tests for schema upgrades of databases created by older versions.
+"""
+
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.api.logs import replay_log_rows
+from app.database import Base, upgrade_schema
+from app.models import ExecutionLog
+from app.serialization import dumps
+
+# Schema as created by the first release (before state patches)
+BASELINE_SCHEMA = [
+    """
+    CREATE TABLE graphs (
+        id VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        description TEXT,
+        nodes TEXT NOT NULL,
+        edges TEXT NOT NULL,
+        created_at DATETIME,
+        updated_at DATETIME,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE workflow_runs (
+        id VARCHAR NOT NULL,
+        graph_id VARCHAR NOT NULL,
+        status VARCHAR(9) NOT NULL,
+        current_state TEXT NOT NULL,
+        current_node VARCHAR,
+        error_message TEXT,
+        started_at DATETIME,
+        completed_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(graph_id) REFERENCES graphs (id)
+    )
+    """,
+    """
+    CREATE TABLE execution_logs (
+        id INTEGER NOT NULL,
+        run_id VARCHAR NOT NULL,
+        node_name VARCHAR NOT NULL,
+        step_number INTEGER NOT NULL,
+        state_before TEXT NOT NULL,
+        state_after TEXT NOT NULL,
+        executed_at DATETIME,
+        error TEXT,
+        PRIMARY KEY (id),
+        FOREIGN KEY(run_id) REFERENCES workflow_runs (id)
+    )
+    """,
+]
+
+
+def make_baseline_db(tmp_path):
+    """Create a database with the baseline schema and one logged step."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO graphs (id, name, nodes, edges) VALUES ('g1', 'old', '[]', '[]')"
+        ))
+        connection.execute(text(
+            "INSERT INTO workflow_runs (id, graph_id, status, current_state) "
+            "VALUES ('r1', 'g1', 'COMPLETED', '{}')"
+        ))
+        connection.execute(text(
+            "INSERT INTO execution_logs (run_id, node_name, step_number, state_before, state_after) "
+            "VALUES ('r1', 'a', 1, '{\"x\": 1}', '{\"x\": 2}')"
+        ))
+    return engine
+
+
+def test_upgrade_adds_patch_column_and_relaxes_state_columns(tmp_path):
+    engine = make_baseline_db(tmp_path)
+    
+    upgrade_schema(engine)
+    
+    columns = {column["name"]: column for column in inspect(engine).get_columns("execution_logs")}
+    assert "state_patch" in columns
+    assert columns["state_before"]["nullable"]
+    assert columns["state_after"]["nullable"]
+    index_names = {index["name"] for index in inspect(engine).get_indexes("execution_logs")}
+    assert "ix_execution_logs_run_id_step_number" in index_names
+
+
+def test_upgraded_db_accepts_patch_rows_and_keeps_old_rows(tmp_path):
+    engine = make_baseline_db(tmp_path)
+    upgrade_schema(engine)
+    
+    with Session(engine) as db:
+        db.bulk_insert_mappings(ExecutionLog, [{
+            "run_id": "r1",
+            "node_name": "b",
+            "step_number": 2,
+            "state_before": None,
+            "state_patch": dumps([{"op": "replace", "path": "/x", "value": 3}]),
+            "error": None
+        }])
+        db.commit()
+        
+        rows = db.execute(
+            select(
+                ExecutionLog.node_name,
+                ExecutionLog.step_number,
+                ExecutionLog.state_before,
+                ExecutionLog.state_after,
+                ExecutionLog.state_patch,
+                ExecutionLog.executed_at,
+                ExecutionLog.error
+            ).order_by(ExecutionLog.step_number)
+        ).mappings()
+        replayed = list(replay_log_rows(rows))
+    
+    assert [(entry["state_before"], entry["state_after"]) for entry in replayed] == [
+        ({"x": 1}, {"x": 2}),
+        ({"x": 2}, {"x": 3}),
+    ]
+
+
+def test_upgrade_is_idempotent(tmp_path):
+    engine = make_baseline_db(tmp_path)
+    
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+    
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM execution_logs")).scalar() == 1
+
+
+def test_upgrade_leaves_current_schema_unchanged(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    Base.metadata.create_all(engine)
+    
+    upgrade_schema(engine)
+    
+    assert {column["name"] for column in inspect(engine).get_columns("execution_logs")} == {
+        column.name for column in ExecutionLog.__table__.columns
+    }
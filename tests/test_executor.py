@@ -0,0 +1,110 @@
+"""
+Tests for the workflow executor.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.engine import FunctionNode, WorkflowExecutor, WorkflowGraph
+
+
+def increment(data):
+    data["count"] = data.get("count", 0) + 1
+    return data
+
+
+def make_chain(*names):
+    """Build a linear graph whose nodes all increment state["count"]."""
+    graph = WorkflowGraph("chain")
+    for name in names:
+        graph.add_node(FunctionNode(name, increment))
+    for from_node, to_node in zip(names, names[1:]):
+        graph.add_edge(from_node, to_node)
+    return graph
+
+
+class FakeManager:
+    """Connection manager stand-in recording published payloads."""
+    
+    def __init__(self, subscribed=True, fail=False):
+        self.subscribed = subscribed
+        self.fail = fail
+        self.payloads = []
+    
+    def has_subscribers(self, run_id):
+        return self.subscribed
+    
+    def publish(self, run_id, payload):
+        if self.fail:
+            raise RuntimeError("stream broken")
+        self.payloads.append(payload)
+
+
+def make_executor(graph, manager):
+    executor = WorkflowExecutor(graph, run_id="run-1")
+    executor._manager = manager
+    return executor
+
+
+def test_streams_every_step_to_subscribers():
+    manager = FakeManager()
+    
+    result = make_executor(make_chain("a", "b"), manager).execute({})
+    
+    assert result["final_state"] == {"count": 2}
+    assert len(manager.payloads) == 3  # two steps plus completion
+
+
+def test_skips_encoding_without_subscribers(monkeypatch):
+    encoded = []
+    monkeypatch.setattr("app.engine.executor.dumps", lambda message: encoded.append(message) or "{}")
+    manager = FakeManager(subscribed=False)
+    
+    make_executor(make_chain("a", "b"), manager).execute({})
+    
+    assert encoded == []
+    assert manager.payloads == []
+
+
+def test_streaming_failure_does_not_fail_run():
+    result = make_executor(make_chain("a", "b"), FakeManager(fail=True)).execute({})
+    
+    assert result["final_state"] == {"count": 2}
+    assert [entry["error"] for entry in result["execution_log"]] == [None, None]
+
+
+def test_node_error_is_logged_and_raised():
+    def explode(data):
+        raise KeyError("missing")
+    
+    graph = make_chain("a")
+    graph.add_node(FunctionNode("boom", explode))
+    graph.add_edge("a", "boom")
+    executor = WorkflowExecutor(graph)
+    
+    with pytest.raises(ValueError, match="Error executing node 'boom'"):
+        executor.execute({})
+    
+    assert executor.execution_log[-1]["node_name"] == "boom"
+    assert executor.execution_log[-1]["error"] == "'missing'"
+    assert all(isinstance(entry["executed_at"], datetime) for entry in executor.execution_log)
+
+
+def test_logged_states_are_independent_copies():
+    result = WorkflowExecutor(make_chain("a", "b", "c")).execute({"count": 0})
+    
+    log = result["execution_log"]
+    assert [entry["state_before"]["count"] for entry in log] == [0, 1, 2]
+    assert [entry["state_after"]["count"] for entry in log] == [1, 2, 3]
+    assert all(log[i]["state_after"] is log[i + 1]["state_before"] for i in range(len(log) - 1))
+
+
+def test_every_log_entry_gets_an_execution_time():
+    before = datetime.utcnow()
+    
+    result = WorkflowExecutor(make_chain("a", "b")).execute({})
+    
+    times = [entry["executed_at"] for entry in result["execution_log"]]
+    assert all(isinstance(executed_at, datetime) for executed_at in times)
+    assert before - timedelta(seconds=1) <= times[0] <= times[1] <= datetime.utcnow()
@@ -0,0 +1,94 @@
+"""
+Tests for workflow graph structure, validation and compiled plans.
+"""
+
+from app.engine import FunctionNode, WorkflowGraph
+
+
+def passthrough(data):
+    return data
+
+
+def make_graph(names, edges, start=None):
+    """Build a graph from node names and (from, to[, condition]) edges."""
+    graph = WorkflowGraph("test")
+    for name in names:
+        graph.add_node(FunctionNode(name, passthrough))
+    for edge in edges:
+        graph.add_edge(*edge)
+    if start is not None:
+        graph.set_start_node(start)
+    return graph
+
+
+def test_validate_reports_unreachable_nodes():
+    graph = make_graph(["a", "b", "c", "d"], [("a", "b"), ("c", "d")])
+    
+    assert graph.validate() == ["Unreachable nodes (not reachable from start node): ['c', 'd']"]
+
+
+def test_validate_follows_conditional_edges():
+    graph = make_graph(["a", "b", "c"], [("a", "b", lambda state: False), ("a", "c")])
+    
+    assert graph.validate() == []
+
+
+def test_validation_is_recomputed_after_changes():
+    graph = make_graph(["a", "b"], [])
+    assert graph.validate()
+    
+    graph.add_edge("a", "b")
+    
+    assert graph.validate() == []
+
+
+def test_unconditional_chain_compiles_to_linear_plan():
+    graph = make_graph(["a", "b", "c"], [("a", "b"), ("b", "c")])
+    
+    plan = graph.compile()
+    
+    assert plan.mode == "linear"
+    assert plan.order == ("a", "b", "c")
+
+
+def test_conditional_edge_compiles_to_branching_plan():
+    condition = lambda state: state.get("go", False)
+    graph = make_graph(["a", "b", "c"], [("a", "b", condition), ("a", "c"), ("b", "c")])
+    
+    plan = graph.compile()
+    
+    assert plan.mode == "branching"
+    # Only "a" needs its edges evaluated; "b" and the end node "c" are fixed
+    assert plan.next_node == {"b": "c", "c": None}
+
+
+def test_plan_is_recompiled_after_changes():
+    graph = make_graph(["a", "b"], [])
+    assert graph.compile().order == ("a",)
+    
+    graph.add_edge("a", "b")
+    
+    assert graph.compile().order == ("a", "b")
+
+
+def test_cycle_is_detected_when_the_closing_edge_is_added():
+    graph = make_graph(["a", "b", "c"], [("a", "b"), ("b", "c")])
+    assert not graph.has_cycle
+    
+    graph.add_edge("c", "a")
+    
+    assert graph.has_cycle
+    assert graph.compile().mode == "branching"
+    assert graph.validate() == []
+
+
+def test_self_loop_is_a_cycle():
+    graph = make_graph(["a"], [("a", "a", lambda state: False)])
+    
+    assert graph.has_cycle
+
+
+def test_diamond_is_not_a_cycle():
+    graph = make_graph(["a", "b", "c", "d"], [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+    
+    assert not graph.has_cycle
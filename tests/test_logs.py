@@ -0,0 +1,62 @@
+"""
+Tests for execution log patch storage and replay.
+"""
+
+import pytest
+
+from app.api.logs import build_log_rows, replay_log_rows
+from app.config import settings
+from app.engine import FunctionNode, WorkflowExecutor, WorkflowGraph
+
+
+def step(data):
+    count = data.get("count", 0) + 1
+    data["count"] = count
+    data.setdefault("history", []).append(count)
+    if count % 2:
+        data["odd"] = True
+    else:
+        data.pop("odd", None)
+    return data
+
+
+def noop(data):
+    return data
+
+
+def run_chain(length):
+    """Run a linear graph of `length` nodes, every third one leaving the state unchanged."""
+    graph = WorkflowGraph("chain")
+    names = [f"n{index}" for index in range(length)]
+    for index, name in enumerate(names):
+        graph.add_node(FunctionNode(name, noop if index % 3 == 2 else step))
+    for from_node, to_node in zip(names, names[1:]):
+        graph.add_edge(from_node, to_node)
+    return WorkflowExecutor(graph).execute({"nested": {"keep": 1}})
+
+
+@pytest.mark.parametrize("interval", [1, 3, 10])
+def test_patches_replay_to_logged_states(monkeypatch, interval):
+    monkeypatch.setattr(settings, "log_snapshot_interval", interval)
+    result = run_chain(8)
+    
+    rows = build_log_rows("run-1", result["execution_log"], result["state_patches"])
+    
+    assert [row["state_before"] is not None for row in rows] == [index % interval == 0 for index in range(8)]
+    replayed = list(replay_log_rows({**row, "state_after": None} for row in rows))
+    assert [entry["state_before"] for entry in replayed] == [entry["state_before"] for entry in result["execution_log"]]
+    assert [entry["state_after"] for entry in replayed] == [entry["state_after"] for entry in result["execution_log"]]
+    assert replayed[-1]["state_after"] == result["final_state"]
+
+
+def test_replay_prefers_a_stored_full_state_after(monkeypatch):
+    monkeypatch.setattr(settings, "log_snapshot_interval", 10)
+    result = run_chain(2)
+    rows = build_log_rows("run-1", result["execution_log"], result["state_patches"])
+    
+    # Rows written before patches existed carry both full states and no patch
+    legacy = [{**row, "state_after": '{"count": 99}', "state_patch": None} for row in rows]
+    replayed = list(replay_log_rows(legacy))
+    
+    assert [entry["state_after"] for entry in replayed] == [{"count": 99}, {"count": 99}]
+    assert replayed[1]["state_before"] == {"count": 99}
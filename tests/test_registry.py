@@ -0,0 +1,42 @@
+"""
+Tests for the tool registry.
+"""
+
+import pytest
+
+from app.tools import registry
+from app.tools.registry import ToolRegistry, tool
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry():
+    """Run each test against an empty registry, restoring the real tools after."""
+    tools = dict(registry._TOOLS)
+    functions = dict(registry._FUNCTIONS)
+    registry.clear()
+    yield
+    registry.clear()
+    registry._TOOLS.update(tools)
+    registry._FUNCTIONS.update(functions)
+
+
+def test_execute_returns_full_state_for_delta_tools():
+    @tool(name="add_total", returns_delta=True)
+    def add_total(state):
+        return {"total": state["a"] + state["b"]}
+    
+    assert ToolRegistry.execute("add_total", {"a": 1, "b": 2}) == {"a": 1, "b": 2, "total": 3}
+
+
+def test_execute_passes_full_state_tools_through():
+    @tool(name="double")
+    def double(state):
+        state["a"] *= 2
+        return state
+    
+    assert ToolRegistry.execute("double", {"a": 2}) == {"a": 4}
+
+
+def test_unknown_tool_raises_key_error():
+    with pytest.raises(KeyError, match="not found in registry"):
+        ToolRegistry.execute("missing", {})
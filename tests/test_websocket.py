@@ -0,0 +1,59 @@
+"""
+Tests for the WebSocket connection manager.
+"""
+
+import asyncio
+
+from app.api.websocket import ConnectionManager
+
+
+def test_publish_without_subscribers_is_dropped():
+    async def scenario():
+        manager = ConnectionManager()
+        manager.start()
+        manager.publish("run-1", "{}")
+        assert manager._outbox.empty()
+        await manager.stop()
+    
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_pending_flushes_and_ignores_late_publishes():
+    async def scenario():
+        manager = ConnectionManager(flush_interval=10)
+        manager.start()
+        manager.active_connections["run-1"] = [object()]
+        await manager.send_raw("run-1", '{"type":"step_complete"}')
+        flush_task = manager._flush_tasks["run-1"]
+        
+        await manager.stop()
+        
+        assert flush_task.cancelled()
+        assert manager._flush_tasks == {}
+        assert manager._pending == {}
+        assert not manager.has_subscribers("run-1")
+        # A publish racing with shutdown must not raise
+        manager.publish("run-1", "{}")
+    
+    asyncio.run(scenario())
+
+
+def test_split_batches_caps_item_count():
+    manager = ConnectionManager()
+    items = ["{}"] * (manager.MAX_BATCH_ITEMS * 2 + 1)
+    
+    batches = manager._split_batches(items)
+    
+    assert [len(batch) for batch in batches] == [manager.MAX_BATCH_ITEMS, manager.MAX_BATCH_ITEMS, 1]
+    assert [item for batch in batches for item in batch] == items
+
+
+def test_split_batches_caps_size_and_isolates_oversized_items(monkeypatch):
+    monkeypatch.setattr(ConnectionManager, "MAX_BATCH_BYTES", 10)
+    manager = ConnectionManager()
+    items = ["aaaa", "bbbb", "cccc", "x" * 25, "dd", "ee"]
+    
+    batches = manager._split_batches(items)
+    
+    # Items plus their separating commas stay within MAX_BATCH_BYTES
+    assert batches == [["aaaa", "bbbb"], ["cccc"], ["x" * 25], ["dd", "ee"]]